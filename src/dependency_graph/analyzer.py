@@ -1,16 +1,53 @@
 from pathlib import Path
-from utils.file_utils import find_files
-from dependency_graph.java_parser import parse_file
-import json
-
-def index_repo(repo_path: str | Path) -> list[dict]:
-    paths = find_files(repo_path, (".java",))
-    files = []
-    for p in paths:
-        files.append(parse_file(p))
-    return files
-
-def write_jsonl(path: str | Path, items: list[dict]):
-    with open(path, "w") as f:
-        for it in items:
-            f.write(json.dumps(it, ensure_ascii=False) + "\n")
+from typing import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from utils.file_utils import iter_files
+from dependency_graph.java_parser import parse_file, get_java_parser
+from dependency_graph.graph_io import write_jsonl  # re-exported for existing callers
+
+def index_repo(repo_path: str | Path, workers: int | None = None, cache=None,
+               sources=None, use_git: bool = False, excludes: Iterable[str] = ()) -> list[dict]:
+    """Parse every .java file under repo_path, in sorted path order.
+
+    Files are parsed as the directory walk (or `git ls-files`, with
+    use_git=True) yields them, so parsing starts before the walk finishes.
+
+    With workers > 1 the files are sharded across a process pool; each worker
+    warms its own parser once and results come back in the same order as the
+    serial path. cache is an optional ParseCache shared by all workers.
+    sources is an optional SourceStore that keeps the bytes read while
+    parsing in-process (pool workers don't ship buffers back; the store maps
+    those files itself on first use). excludes are extra globs skipped by
+    the walk (see iter_files).
+    """
+    paths = iter_files(repo_path, (".java",), excludes=excludes, use_git=use_git)
+    return parse_files(paths, workers, cache, sources)
+
+# chunk size for path streams whose length isn't known up front
+_STREAM_CHUNKSIZE = 16
+
+def parse_files(paths: Iterable[Path], workers: int | None = None, cache=None,
+                sources=None) -> list[dict]:
+    """parse_file() over paths, optionally in a process pool; keeps input order.
+
+    paths may be a lazy iterator; it is consumed as files are handed out.
+    """
+    sized = hasattr(paths, "__len__")
+    if not workers or workers <= 1 or (sized and len(paths) < 2):
+        return [parse_file(p, cache, sources) for p in paths]
+
+    # a few chunks per worker keeps the pool busy without per-file IPC cost
+    chunksize = max(1, len(paths) // (workers * 4)) if sized else _STREAM_CHUNKSIZE
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(cache,)) as ex:
+        return list(ex.map(_parse_in_worker, paths, chunksize=chunksize))
+
+_worker_cache = None
+
+def _init_worker(cache):
+    global _worker_cache
+    _worker_cache = cache
+    get_java_parser()
+
+def _parse_in_worker(path):
+    return parse_file(path, _worker_cache)
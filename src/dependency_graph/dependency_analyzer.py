@@ -1,5 +1,12 @@
+from array import array
 from collections import defaultdict, Counter
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+import re
+import time
+
+from dependency_graph.graph_algorithms import iter_bits, strongly_connected_components
+from dependency_graph.graph_store import EdgeListView, GraphStore
 
 # canon ids
 def module_id(pkg):           return f"module:{pkg}"
@@ -8,250 +15,584 @@ def interface_id(fqn):        return f"interface:{fqn}"
 def method_id(owner,name,sig):return f"method:{owner}#{name}({sig})"
 def ctor_id(owner,sig=""):    return f"constructor:{owner}::<init>({sig})"
 
+def file_imports(sym):
+    """Split a file's imports into ({simple: fqn}, (wildcard_pkg, ...))."""
+    single, wildcards = {}, []
+    for imp in sym.get("imports", []) or []:
+        if imp.endswith(".*"):
+            wildcards.append(imp[:-2])
+        else:
+            single[imp.rsplit(".", 1)[-1]] = imp
+    return single, tuple(wildcards)
+
+# how stage 4b expands virtual calls: not at all, to every subtype's
+# override (class hierarchy analysis), or to instantiated subtypes only
+# (rapid type analysis)
+DISPATCH_MODES = ("static", "cha", "rta")
+
+# edges that make one node depend on another, for cycle detection
+CYCLE_LABELS = ("Calls", "Uses", "Instantiates")
+
+_IDENT = re.compile(r"[A-Za-z_$][\w$]*")
+
+def referenced_names(sym):
+    """Every identifier a file declares or could resolve against the symbol tables."""
+    texts = list(sym.get("imports", []) or [])
+    for t in sym["types"]:
+        texts += [t["fqn"].rsplit(".", 1)[-1]] + t["extends"] + t.get("implements", [])
+    for m in sym["methods"]:
+        texts += m.get("params", []) or []
+        texts.append(m.get("return_type") or "")
+    for fl in sym.get("fields", []) or []:
+        texts.append(fl.get("type") or "")
+    for st in sym["stmts"]:
+        texts += [v for v in (st["parts"].get("type"), st["parts"].get("recv")) if v]
+    return {w for t in texts for w in _IDENT.findall(t)}
+
+class EdgeOrigins:
+    """
+    Which files produced each edge, kept per file for update_files().
+
+    by_file maps a path to the packed keys of the edges it produced; shared
+    counts the producing files of the few edges that have more than one.
+    Dropping a file therefore only touches that file's own edges. Files not
+    in by_file are fetched with load(path) on first use, so a persisted
+    state only has to read the files that are being re-analyzed.
+    """
+
+    def __init__(self, load=None, shared=None):
+        self.by_file = {}            # path -> {packed edge key}
+        self.shared = shared or {}   # packed edge key -> number of producing files (> 1)
+        self._load = load
+
+    def keys(self, path):
+        keys = self.by_file.get(path)
+        if keys is None:
+            keys = self.by_file[path] = set(self._load(path)) if self._load else set()
+        return keys
+
+    def add(self, path, key, new):
+        """Record that path produced key; new is False if the graph already had the edge."""
+        keys = self.keys(path)
+        if key in keys:
+            return
+        keys.add(key)
+        if not new:
+            self.shared[key] = self.shared.get(key, 1) + 1
+
+    def drop(self, path):
+        """Forget path's edges; returns the keys no other file produces."""
+        gone = []
+        for key in self.keys(path):
+            n = self.shared.get(key)
+            if n is None:
+                gone.append(key)
+            elif n > 2:
+                self.shared[key] = n - 1
+            else:
+                del self.shared[key]
+        self.by_file[path] = set()
+        return gone
+
+
+class Referrers:
+    """
+    name -> paths of the files that reference or declare it, for update_files().
+
+    Names not in by_name are fetched with load(name) on first use, and every
+    name whose paths change is recorded in dirty, so a persisted state only
+    reads and rewrites the names that a change touches.
+    """
+
+    def __init__(self, load=None):
+        self.by_name = {}    # name -> {path}
+        self.dirty = set()   # names changed since the last save
+        self._load = load
+
+    def paths(self, name):
+        paths = self.by_name.get(name)
+        if paths is None:
+            paths = self.by_name[name] = set(self._load(name)) if self._load else set()
+        return paths
+
+    def add(self, name, path):
+        self.paths(name).add(path)
+        self.dirty.add(name)
+
+    def discard(self, name, path):
+        self.paths(name).discard(path)
+        self.dirty.add(name)
+
+
 class Analyzer:
-    def __init__(self):
+    def __init__(self, track_origins=False, dispatch="static"):
+        if dispatch not in DISPATCH_MODES:
+            raise ValueError(f"dispatch must be one of {DISPATCH_MODES}, not {dispatch!r}")
         self.files = []           # raw file summaries from parser
         self.nodes = []           # [{id,label}]
-        self.edges = []           # [{src,label,dst,resolved}]
-        self._edge_set = set()
+        self.graph = GraphStore() # edges; self.edges is a [{src,label,dst,resolved}] view
+        # files that produced each edge, and name -> {files that reference or
+        # declare it}; needed by update_files()
+        self.edge_origins = EdgeOrigins() if track_origins else None
+        self.referrers = None
+        self._origin = None
+        self.dispatch = dispatch
+        # (path, caller, receiver fqn, name, arity) of virtual calls, for stage 4b
+        self.call_sites = [] if dispatch != "static" else None
 
         # symbol tables
-        self.classes_by_fqn = {}  # fqn -> {node_id, pkg, name, extends[]}
-        self.methods_by_owner_sig = {}  # "owner#name(sig)" -> node_id
+        self.classes_by_fqn = {}  # fqn -> {node_id, pkg, name, extends[], imports}
+        self.classes_by_simple = defaultdict(list)  # simple name -> [fqn]
+        self._resolve_memo = {}    # (simple, pkg) -> (exact fqn, suffix guess)
+        self.methods = {}          # method node_id -> MethodRecord
         self.methods_index = {}    # (owner,name,arity) -> method node
         self.parents = {}          # child_fqn -> base_fqn
+        # derived from the tables above; dropped by _hierarchy_changed()
+        self._hierarchy_memo = {}  # fqn -> (superclass chain, implemented interfaces)
+        self._lookup_memo = {}     # (owner,name,arity) -> method node inherited by owner, or None
+
+    @property
+    def edges(self):
+        return EdgeListView(self.graph)
+
+    @edges.setter
+    def edges(self, edges):
+        self.graph = GraphStore()
+        for e in edges:
+            self.add_edge(e["src"], e["label"], e["dst"], e.get("resolved", True))
 
     def add_edge(self, src, label, dst, resolved=True):
-        key = (src,label,dst)
-        if key in self._edge_set: return
-        self._edge_set.add(key)
-        self.edges.append({"src":src,"label":label,"dst":dst,"resolved":bool(resolved)})
+        new = self.graph.add_edge(src, label, dst, resolved)
+        if self.edge_origins is not None:
+            self.edge_origins.add(self._origin, self.graph.key(src, label, dst), new)
+
+    # ---- pipeline ----
+    def run(self, on_stage=None, workers=None):
+        """
+        Build the graph from self.files in three passes instead of one per
+        stage, plus a fourth when virtual calls are dispatched.
+
+        1. symbols: stage 1 nodes and stage 2 symbol tables, per file
+        2. hierarchy: stage 3/3b over the symbol tables
+        3. resolve: stage 4 and 5 fused, per file (imports resolved once)
+        4. dispatch: stage 4b, only with dispatch="cha" or "rta"
+
+        Produces the same nodes and edges as calling stage1..stage5 in order;
+        only the order edges are added in differs. Pass durations (seconds)
+        are kept in self.timings and, if given, reported to
+        on_stage(name, seconds) as each pass finishes. With workers > 1 the
+        resolve pass is spread over a process pool (see resolve_files).
+        """
+        self.timings = {}
+
+        def timed(name, fn):
+            start = time.perf_counter()
+            fn()
+            self.timings[name] = elapsed = time.perf_counter() - start
+            if on_stage is not None:
+                on_stage(name, elapsed)
+
+        timed("symbols", self._symbols_pass)
+        timed("hierarchy", self._hierarchy_pass)
+        timed("resolve", lambda: self.resolve_files(self.files, workers))
+        if self.dispatch != "static":
+            timed("dispatch", self.stage4b_dispatch)
+        return self
+
+    def _symbols_pass(self):
+        for f in self.files:
+            self._syntactic_file(f)
+            self._symbols_file(f)
+
+    def _hierarchy_pass(self):
+        self.stage3_cha_and_overrides()
+        self.stage3b_implements()
+
+    def resolve_files(self, files, workers=None):
+        """
+        Stages 4 and 5 for the given files, once the symbol tables are final.
+
+        Resolution only reads the symbol tables, so with workers > 1 the files
+        are fanned out to a process pool. Workers get a snapshot of the tables
+        when they start (inherited copy-on-write where the platform forks)
+        and send back each file's edges, which are merged here in file order;
+        the graph ends up exactly as the serial loop would leave it.
+        """
+        if not workers or workers <= 1 or len(files) < 2:
+            for f in files:
+                self._resolve_file(f)
+            return
+        tables = (self.classes_by_fqn, self.classes_by_simple, self.methods_index, self.parents,
+                  self.dispatch)
+        chunksize = max(1, len(files) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_resolver,
+                                 initargs=(tables, files)) as ex:
+            for f, (edges, sites) in zip(files, ex.map(_resolve_in_worker, range(len(files)),
+                                                       chunksize=chunksize)):
+                self._origin = f["path"]
+                for src, label, dst, resolved in edges:
+                    self.add_edge(src, label, dst, resolved)
+                if sites:
+                    self.call_sites.extend(sites)
+
+    def _resolve_file(self, f):
+        self._origin = f["path"]
+        sym = f["symbols"]
+        pkg = sym["package"]
+        imports = file_imports(sym)
+        self._calls_and_news(sym, pkg, imports)
+        self._type_usage(sym, pkg, imports)
 
     # ---- stage 1: add module/class/interface/method nodes and ParentOf/ChildOf ----
     def stage1_add_syntactic(self):
         for f in self.files:
-            file_path = Path(f["path"])
-            # Get relative path for metadata
-            try:
-                # Try to get relative path from a common root
-                rel_path = str(file_path)
-            except:
-                rel_path = str(file_path)
+            self._syntactic_file(f)
+
+    def _syntactic_file(self, f):
+        self._origin = f["path"]
+        file_path = Path(f["path"])
+        # Get relative path for metadata
+        try:
+            # Try to get relative path from a common root
+            rel_path = str(file_path)
+        except:
+            rel_path = str(file_path)
+        
+        sym = f["symbols"]
+        pkg = sym["package"]
+        mid = module_id(pkg)
+        self.nodes.append({
+            "id": mid, 
+            "label": f"Module: {pkg}",
+            "metadata": {
+                "file_path": rel_path,
+                # lets SourceStore reject slices of an edited file
+                "file_sha256": sym.get("sha256"),
+                "line_range": [1, sym["line_count"]]
+            }
+        })
+        
+        for t in sym["types"]:
+            cid = t["node_id"]
+            fqn = t["fqn"]
+            line_range = t.get("line_range", [1, 1])
+            # source text stays in the file; SourceStore slices it on demand
+            byte_range = t.get("range", [0, 0])
+            
+            if t.get("is_interface", False):
+                self.nodes.append({
+                    "id": cid, 
+                    "label": f"Interface: {t['name']}",
+                    "metadata": {
+                        "file_path": rel_path,
+                        "line_range": line_range,
+                        "byte_range": byte_range,
+                        "owner_fqn": fqn,
+                        "is_interface": True
+                    }
+                })
+            else:
+                self.nodes.append({
+                    "id": cid, 
+                    "label": f"Class: {t['name']}",
+                    "metadata": {
+                        "file_path": rel_path,
+                        "line_range": line_range,
+                        "byte_range": byte_range,
+                        "owner_fqn": fqn,
+                        "is_interface": False
+                    }
+                })
+            self.add_edge(mid, "ParentOf", cid)
+            self.add_edge(cid, "ChildOf", mid)
+        
+        for m in sym["methods"]:
+            mid_m = m.node_id
+            line_range = m.line_range
+            byte_range = m.range
             
-            # Read source code once per file
-            source_code = file_path.read_text(encoding="utf-8")
+            # Owner could be class or interface - lookup from current file's types
+            owner_fqn = m.owner_fqn
+            # Find the owner type in the current file's symbols
+            owner_info = None
+            for t in sym["types"]:
+                if t["fqn"] == owner_fqn:
+                    owner_info = t
+                    break
             
-            sym = f["symbols"]
-            pkg = sym["package"]
-            mid = module_id(pkg)
             self.nodes.append({
-                "id": mid, 
-                "label": f"Module: {pkg}",
+                "id": mid_m, 
+                "label": f"Method: {m.name}",
                 "metadata": {
                     "file_path": rel_path,
-                    "line_range": [1, len(source_code.splitlines())]
+                    "line_range": line_range,
+                    "byte_range": byte_range,
+                    "owner_fqn": owner_fqn,
+                    "return_type": m.return_type,
+                    "params": m.params
                 }
             })
             
-            for t in sym["types"]:
-                cid = t["node_id"]
-                fqn = t["fqn"]
-                line_range = t.get("line_range", [1, 1])
-                byte_range = t.get("range", [0, 0])
-                
-                # Extract source code for class/interface
-                class_source = source_code[byte_range[0]:byte_range[1]] if byte_range else ""
-                
-                if t.get("is_interface", False):
-                    self.nodes.append({
-                        "id": cid, 
-                        "label": f"Interface: {t['name']}",
-                        "metadata": {
-                            "file_path": rel_path,
-                            "line_range": line_range,
-                            "source_code": class_source,
-                            "owner_fqn": fqn,
-                            "is_interface": True
-                        }
-                    })
-                else:
-                    self.nodes.append({
-                        "id": cid, 
-                        "label": f"Class: {t['name']}",
-                        "metadata": {
-                            "file_path": rel_path,
-                            "line_range": line_range,
-                            "source_code": class_source,
-                            "owner_fqn": fqn,
-                            "is_interface": False
-                        }
-                    })
-                self.add_edge(mid, "ParentOf", cid)
-                self.add_edge(cid, "ChildOf", mid)
-            
-            for m in sym["methods"]:
-                mid_m = m["node_id"]
-                line_range = m.get("line_range", [1, 1])
-                byte_range = m.get("range", [0, 0])
-                
-                # Extract source code for method
-                method_source = source_code[byte_range[0]:byte_range[1]] if byte_range else ""
-                
-                # Owner could be class or interface - lookup from current file's types
-                owner_fqn = m["owner_fqn"]
-                # Find the owner type in the current file's symbols
-                owner_info = None
-                for t in sym["types"]:
-                    if t["fqn"] == owner_fqn:
-                        owner_info = t
-                        break
-                
-                self.nodes.append({
-                    "id": mid_m, 
-                    "label": f"Method: {m['name']}",
-                    "metadata": {
-                        "file_path": rel_path,
-                        "line_range": line_range,
-                        "source_code": method_source,
-                        "owner_fqn": owner_fqn,
-                        "return_type": m.get("return_type"),
-                        "params": m.get("params", [])
-                    }
-                })
-                
-                if owner_info and owner_info.get("is_interface", False):
-                    owner = interface_id(owner_fqn)
-                else:
-                    owner = class_id(owner_fqn)
-                self.add_edge(owner, "ParentOf", mid_m)
-                self.add_edge(mid_m, "ChildOf", owner)
+            if owner_info and owner_info.get("is_interface", False):
+                owner = interface_id(owner_fqn)
+            else:
+                owner = class_id(owner_fqn)
+            self.add_edge(owner, "ParentOf", mid_m)
+            self.add_edge(mid_m, "ChildOf", owner)
 
     # ---- stage 2: build symbol tables ----
     def stage2_build_symbols(self):
         for f in self.files:
-            sym = f["symbols"]
-            pkg = sym["package"]
-            for t in sym["types"]:
-                self.classes_by_fqn[t["fqn"]] = {
-                    "node_id": t["node_id"], "pkg": pkg, "name": t["name"], 
-                    "extends": t["extends"], "implements": t.get("implements", []),
-                    "is_interface": t.get("is_interface", False)
-                }
-            for m in sym["methods"]:
-                key = m["sig"]         # "owner#name(sig)"
-                self.methods_by_owner_sig[key] = m["node_id"]
-                # arity index
-                owner, rest = key.split("#",1)
-                name, sig = rest.split("(",1)
-                sig = sig.rstrip(")")
-                arity = 0 if sig == "" else len([p for p in sig.split(",") if p])
-                self.methods_index[(owner, name, arity)] = m["node_id"]
+            self._symbols_file(f)
+
+    def _symbols_file(self, f):
+        sym = f["symbols"]
+        pkg = sym["package"]
+        imports = file_imports(sym)
+        for t in sym["types"]:
+            if t["fqn"] not in self.classes_by_fqn:
+                self.classes_by_simple[t["fqn"].rsplit(".", 1)[-1]].append(t["fqn"])
+            self.classes_by_fqn[t["fqn"]] = {
+                "node_id": t["node_id"], "pkg": pkg, "name": t["name"], 
+                "extends": t["extends"], "implements": t.get("implements", []),
+                "is_interface": t.get("is_interface", False),
+                "imports": imports, "path": f["path"]
+            }
+        for m in sym["methods"]:
+            self.methods[m.node_id] = m
+            # arity index
+            self.methods_index[(m.owner_fqn, m.name, m.arity)] = m.node_id
+        self._resolve_memo.clear()
+        self._hierarchy_changed()
 
     # ---- stage 3: CHA + overrides ----
     def stage3_cha_and_overrides(self):
         # CHA
         for fqn, info in self.classes_by_fqn.items():
-            for base_simple in info["extends"]:
-                base_fqn = self._resolve_simple(base_simple, info["pkg"])
-                if not base_fqn: continue
-                self.parents[fqn] = base_fqn
-                self.add_edge(class_id(base_fqn), "BaseClassOf", class_id(fqn))
-                self.add_edge(class_id(fqn), "DerivedClassOf", class_id(base_fqn))
+            self._cha_class(fqn, info)
         # overrides (name+arity match up the chain)
-        for key, mid in self.methods_by_owner_sig.items():
-            owner, rest = key.split("#",1)
-            name, sig = rest.split("(",1)
-            sig = sig.rstrip(")")
-            arity = 0 if sig == "" else len([p for p in sig.split(",") if p])
-            for anc in self._ancestors(owner):
-                cand = self.methods_index.get((anc, name, arity))
+        for m in self.methods.values():
+            self._overrides_method(m)
+
+    def _cha_class(self, fqn, info, add_edges=True):
+        self._origin = info.get("path")
+        for base_simple in info["extends"]:
+            base_fqn = self._resolve_simple(base_simple, info["pkg"], info.get("imports"))
+            if not base_fqn: continue
+            if self.parents.get(fqn) != base_fqn:
+                self.parents[fqn] = base_fqn
+                self._hierarchy_changed()
+            if not add_edges: continue
+            self.add_edge(class_id(base_fqn), "BaseClassOf", class_id(fqn))
+            self.add_edge(class_id(fqn), "DerivedClassOf", class_id(base_fqn))
+
+    def _overrides_method(self, m):
+        mid, owner, name, arity = m.node_id, m.owner_fqn, m.name, m.arity
+        owner_info = self.classes_by_fqn.get(owner)
+        self._origin = owner_info.get("path") if owner_info else None
+        supers, interfaces = self._hierarchy(owner)
+        for anc in supers:
+            cand = self.methods_index.get((anc, name, arity))
+            if cand:
+                self.add_edge(mid, "Overrides", cand)
+                self.add_edge(cand, "OverriddenBy", mid)
+                break
+        # Check implemented interfaces for overrides
+        if owner_info and not owner_info.get("is_interface", False):
+            for interface_fqn in interfaces:
+                cand = self.methods_index.get((interface_fqn, name, arity))
                 if cand:
                     self.add_edge(mid, "Overrides", cand)
                     self.add_edge(cand, "OverriddenBy", mid)
                     break
-            # Check implemented interfaces for overrides
-            owner_info = self.classes_by_fqn.get(owner)
-            if owner_info and not owner_info.get("is_interface", False):
-                for interface_simple in owner_info.get("implements", []):
-                    interface_fqn = self._resolve_simple(interface_simple, owner_info["pkg"])
-                    if interface_fqn:
-                        cand = self.methods_index.get((interface_fqn, name, arity))
-                        if cand:
-                            self.add_edge(mid, "Overrides", cand)
-                            self.add_edge(cand, "OverriddenBy", mid)
-                            break
 
     # ---- stage 3b: implements relationships ----
     def stage3b_implements(self):
         """Process implements relationships (class -> interface)"""
         for fqn, info in self.classes_by_fqn.items():
-            if info.get("is_interface", False):
+            self._implements_class(fqn, info)
+
+    def _implements_class(self, fqn, info):
+        if info.get("is_interface", False):
+            return
+        self._origin = info.get("path")
+        for interface_simple in info.get("implements", []):
+            interface_fqn = self._resolve_simple(interface_simple, info["pkg"], info.get("imports"))
+            if not interface_fqn:
                 continue
-            for interface_simple in info.get("implements", []):
-                interface_fqn = self._resolve_simple(interface_simple, info["pkg"])
-                if not interface_fqn:
-                    continue
-                class_node = class_id(fqn)
-                interface_node = interface_id(interface_fqn)
-                self.add_edge(class_node, "Implements", interface_node)
-                self.add_edge(interface_node, "ImplementedBy", class_node)
+            class_node = class_id(fqn)
+            interface_node = interface_id(interface_fqn)
+            self.add_edge(class_node, "Implements", interface_node)
+            self.add_edge(interface_node, "ImplementedBy", class_node)
 
     # ---- stage 4: resolve Calls/Instantiates ----
     def stage4_calls_and_news(self):
         for f in self.files:
-            sym = f["symbols"]
-            pkg = sym["package"]
-            # group by owner
-            per_owner = defaultdict(list)
-            for s in sym["stmts"]:
-                per_owner[s["owner_method"]].append(s)
-            for owner_id, stmts in per_owner.items():
-                owner_fqn = owner_id[len("method:"):].split("#",1)[0]
-                locals_map = {"this": owner_fqn}
-                base = self.parents.get(owner_fqn)
-                if base: locals_map["super"] = base
-                # first pass: locals
-                for s in sorted(stmts, key=lambda x: x["range"][0]):
-                    if s["kind"] == "local":
-                        t = s["parts"]["type"]
-                        fqn = self._resolve_simple(t, pkg)
-                        if fqn: locals_map[s["parts"]["name"]] = fqn
-                # second pass: news + calls
-                for s in sorted(stmts, key=lambda x: x["range"][0]):
-                    if s["kind"] == "new":
-                        fqn = self._resolve_simple(s["parts"]["type"], pkg)
-                        if not fqn: continue
-                        tgt = class_id(fqn)  # Point to class instead of constructor
-                        self.add_edge(owner_id, "Instantiates", tgt)
-                        self.add_edge(tgt, "InstantiatedBy", owner_id)
-                    elif s["kind"] == "call":
-                        recv = s["parts"]["recv"]
-                        name = s["parts"]["name"]
-                        arity = len(s["parts"]["args"])
-                        recv_fqn = None
-                        if recv in (None, "", "this"):
-                            recv_fqn = owner_fqn
-                        elif recv == "super":
-                            recv_fqn = self.parents.get(owner_fqn)
-                        elif recv in locals_map:
-                            recv_fqn = locals_map[recv]
-                        else:
-                            recv_fqn = self._resolve_simple(recv, pkg)  # maybe static
-                        if not recv_fqn: continue
-                        tgt = self._lookup_method(recv_fqn, name, arity)
-                        if tgt:
-                            self.add_edge(owner_id, "Calls", tgt)
-                            self.add_edge(tgt, "CalledBy", owner_id)
+            self._calls_and_news_file(f)
+
+    def _calls_and_news_file(self, f):
+        self._origin = f["path"]
+        sym = f["symbols"]
+        self._calls_and_news(sym, sym["package"], file_imports(sym))
+
+    def _calls_and_news(self, sym, pkg, imports):
+        # group by enclosing method (an index into sym["methods"])
+        per_owner = defaultdict(list)
+        for s in sym["stmts"]:
+            per_owner[s["method"]].append(s)
+        for method, stmts in per_owner.items():
+            owner = sym["methods"][method]
+            owner_id, owner_fqn = owner.node_id, owner.owner_fqn
+            locals_map = {"this": owner_fqn}
+            base = self.parents.get(owner_fqn)
+            if base: locals_map["super"] = base
+            stmts.sort(key=lambda x: x["range"][0])
+            # first pass: locals
+            for s in stmts:
+                if s["kind"] == "local":
+                    t = s["parts"]["type"]
+                    fqn = self._resolve_simple(t, pkg, imports)
+                    if fqn: locals_map[s["parts"]["name"]] = fqn
+            # second pass: news + calls
+            for s in stmts:
+                if s["kind"] == "new":
+                    fqn = self._resolve_simple(s["parts"]["type"], pkg, imports)
+                    if not fqn: continue
+                    tgt = class_id(fqn)  # Point to class instead of constructor
+                    self.add_edge(owner_id, "Instantiates", tgt)
+                    self.add_edge(tgt, "InstantiatedBy", owner_id)
+                elif s["kind"] == "call":
+                    recv = s["parts"]["recv"]
+                    name = s["parts"]["name"]
+                    arity = len(s["parts"]["args"])
+                    recv_fqn = None
+                    virtual = False
+                    if recv in (None, "", "this"):
+                        recv_fqn = owner_fqn
+                        virtual = True
+                    elif recv == "super":
+                        recv_fqn = self.parents.get(owner_fqn)
+                    elif recv in locals_map:
+                        recv_fqn = locals_map[recv]
+                        virtual = True
+                    else:
+                        recv_fqn = self._resolve_simple(recv, pkg, imports)  # maybe static
+                    if not recv_fqn: continue
+                    tgt = self._lookup_method(recv_fqn, name, arity)
+                    if tgt:
+                        self.add_edge(owner_id, "Calls", tgt)
+                        self.add_edge(tgt, "CalledBy", owner_id)
+                        if virtual and self.call_sites is not None:
+                            self.call_sites.append((self._origin, owner_id, recv_fqn, name, arity))
+
+    # ---- stage 4b: fan virtual calls out to overrides (CHA / RTA) ----
+    def stage4b_dispatch(self):
+        """
+        Link virtual calls to every method they may dispatch to at runtime.
+
+        Stage 4 resolves a call on the receiver's static type only. For each
+        call it recorded as virtual (on this, or on a local variable), this
+        adds Calls edges to the method each subtype of the receiver type
+        would run: all subtypes with dispatch="cha", only those some method
+        instantiates (Instantiates edges) with "rta". Targets are computed
+        once per (receiver type, name, arity).
+        """
+        if not self.call_sites:
+            return
+        index, comp, members, subtypes = self._subtype_sets()
+        if self.dispatch == "rta":
+            g = self.graph
+            code = g.label_code("Instantiates")
+            flags = bytearray((len(members) + 7) // 8)
+            for p in range(len(g)):
+                if g.label[p] == code:
+                    i = index.get(g.node_ids[g.dst[p]][len("class:"):])
+                    if i is not None:
+                        flags[comp[i] >> 3] |= 1 << (comp[i] & 7)
+            live = int.from_bytes(flags, "little")
+        targets = {}
+        for path, caller, recv_fqn, name, arity in self.call_sites:
+            key = (recv_fqn, name, arity)
+            found = targets.get(key)
+            if found is None:
+                found = targets[key] = []
+                i = index.get(recv_fqn)
+                if i is not None:
+                    low, bits = subtypes[comp[i]]
+                    if self.dispatch == "rta":
+                        bits &= live >> low
+                    for c in iter_bits(bits):
+                        for sub in members[low + c]:
+                            tgt = self._lookup_method(sub, name, arity)
+                            if tgt and tgt not in found:
+                                found.append(tgt)
+            self._origin = path
+            for tgt in found:
+                self.add_edge(caller, "Calls", tgt)
+                self.add_edge(tgt, "CalledBy", caller)
+
+    def _subtype_sets(self):
+        """
+        Subtypes of every class and interface as bitsets over components.
+
+        Classes are grouped by a Tarjan pass over the direct-subtype edges
+        (only a broken, cyclic hierarchy puts several in one component).
+        Tarjan numbers a subtree's components just before its root's, so a
+        subtype set is stored as (low, bits): component low + i is a subtype
+        iff bit i is set, which keeps single-inheritance subtrees a few words
+        long. Returns ({fqn: class index}, component of each class index,
+        class fqns per component, (low, bits) per component).
+        """
+        names = list(self.classes_by_fqn)
+        index = {fqn: i for i, fqn in enumerate(names)}
+        children = [[] for _ in names]
+        for fqn, subs in self._subtype_map().items():
+            if fqn in index:
+                children[index[fqn]] = [index[sub] for sub in subs if sub in index]
+        comp, count = strongly_connected_components(len(names), children.__getitem__)
+        members = [[] for _ in range(count)]
+        for i, c in enumerate(comp):
+            members[c].append(i)
+        # subtypes have lower component numbers, so ascending order sees them first
+        subtypes = []
+        for c, group in enumerate(members):
+            below = [subtypes[comp[k]] for i in group for k in children[i] if comp[k] != c]
+            low = min((k_low for k_low, _ in below), default=c)
+            bits = 1 << (c - low)
+            for k_low, k_bits in below:
+                bits |= k_bits << (k_low - low)
+            subtypes.append((low, bits))
+        return index, comp, [[names[i] for i in group] for group in members], subtypes
 
     # ---- helpers ----
-    def _resolve_simple(self, simple, pkg):
+    def _resolve_simple(self, simple, pkg, imports=None):
+        key = (simple, pkg)
+        hit = self._resolve_memo.get(key)
+        if hit is None:
+            hit = self._resolve_memo[key] = self._resolve_in_repo(simple, pkg)
+        exact, guess = hit
+        if imports:
+            single, wildcards = imports
+            # a single-type import names the type outright, even if it lives
+            # outside the repo
+            if simple in single:
+                fqn = single[simple]
+                return fqn if fqn in self.classes_by_fqn else None
+            if exact: return exact
+            for wpkg in wildcards:
+                cand = f"{wpkg}.{simple}"
+                if cand in self.classes_by_fqn: return cand
+        return exact or guess
+
+    def _resolve_in_repo(self, simple, pkg):
+        """Return (same-package match, suffix-match guess) for a simple name."""
         # exact match by package first
         cand = f"{pkg}.{simple}" if pkg and not simple.startswith(pkg) else simple
-        if cand in self.classes_by_fqn: return cand
-        # fallback: suffix match
-        for fqn in self.classes_by_fqn.keys():
-            if fqn.endswith("." + simple) or fqn == simple: return fqn
-        return None
+        if cand in self.classes_by_fqn: return cand, None
+        # fallback: suffix match among classes sharing the simple name
+        for fqn in self.classes_by_simple.get(simple.rsplit(".", 1)[-1], ()):
+            if fqn.endswith("." + simple) or fqn == simple: return None, fqn
+        return None, None
 
     # ---- stage 5: resolve Uses/UsedBy (type dependencies) ----
     def stage5_type_usage(self):
@@ -264,83 +605,342 @@ class Analyzer:
         Only track types defined in this repo (ignore primitives/JDK types).
         """
         for f in self.files:
-            sym = f["symbols"]
-            pkg = sym["package"]
+            self._type_usage_file(f)
 
-            # 1) Local variable types
-            for s in sym["stmts"]:
-                if s["kind"] == "local":
-                    owner_method = s["owner_method"]
-                    var_type = s["parts"].get("type")
-                    if not var_type:
-                        continue
-                    clean = var_type.replace("[]", "").strip()
-                    type_fqn = self._resolve_simple(clean, pkg)
-                    if type_fqn and type_fqn in self.classes_by_fqn:
-                        type_info = self.classes_by_fqn[type_fqn]
-                        if type_info.get("is_interface", False):
-                            cls_node = interface_id(type_fqn)
-                        else:
-                            cls_node = class_id(type_fqn)
-                        self.add_edge(owner_method, "Uses", cls_node)
-                        self.add_edge(cls_node, "UsedBy", owner_method)
-
-            # 2) Method parameter and return types
-            for m in sym["methods"]:
-                method_node = m["node_id"]
-                # params
-                for ptype in m.get("params", []) or []:
-                    clean = ptype.replace("[]", "").strip()
-                    type_fqn = self._resolve_simple(clean, pkg)
-                    if type_fqn and type_fqn in self.classes_by_fqn:
-                        type_info = self.classes_by_fqn[type_fqn]
-                        if type_info.get("is_interface", False):
-                            cls_node = interface_id(type_fqn)
-                        else:
-                            cls_node = class_id(type_fqn)
-                        self.add_edge(method_node, "Uses", cls_node)
-                        self.add_edge(cls_node, "UsedBy", method_node)
-                # return type
-                rtype = m.get("return_type")
-                if rtype:
-                    clean = rtype.replace("[]", "").strip()
-                    type_fqn = self._resolve_simple(clean, pkg)
-                    if type_fqn and type_fqn in self.classes_by_fqn:
-                        type_info = self.classes_by_fqn[type_fqn]
-                        if type_info.get("is_interface", False):
-                            cls_node = interface_id(type_fqn)
-                        else:
-                            cls_node = class_id(type_fqn)
-                        self.add_edge(method_node, "Uses", cls_node)
-                        self.add_edge(cls_node, "UsedBy", method_node)
-
-            # 3) Field types (per class)
-            for field in sym.get("fields", []) or []:
-                owner_class = class_id(field["owner_fqn"]) if field.get("owner_fqn") else None
-                ftype = field.get("type")
-                if not owner_class or not ftype:
+    def _type_usage_file(self, f):
+        self._origin = f["path"]
+        sym = f["symbols"]
+        self._type_usage(sym, sym["package"], file_imports(sym))
+
+    def _type_usage(self, sym, pkg, imports):
+        # 1) Local variable types
+        for s in sym["stmts"]:
+            if s["kind"] == "local":
+                owner_method = sym["methods"][s["method"]].node_id
+                var_type = s["parts"].get("type")
+                if not var_type:
                     continue
-                clean = ftype.replace("[]", "").strip()
-                type_fqn = self._resolve_simple(clean, pkg)
+                clean = var_type.replace("[]", "").strip()
+                type_fqn = self._resolve_simple(clean, pkg, imports)
                 if type_fqn and type_fqn in self.classes_by_fqn:
                     type_info = self.classes_by_fqn[type_fqn]
                     if type_info.get("is_interface", False):
                         cls_node = interface_id(type_fqn)
                     else:
                         cls_node = class_id(type_fqn)
-                    self.add_edge(owner_class, "Uses", cls_node)
-                    self.add_edge(cls_node, "UsedBy", owner_class)
+                    self.add_edge(owner_method, "Uses", cls_node)
+                    self.add_edge(cls_node, "UsedBy", owner_method)
 
-    def _ancestors(self, fqn):
-        cur = self.parents.get(fqn)
-        while cur:
-            yield cur
-            cur = self.parents.get(cur)
+        # 2) Method parameter and return types
+        for m in sym["methods"]:
+            method_node = m.node_id
+            # params
+            for ptype in m.params:
+                clean = ptype.replace("[]", "").strip()
+                type_fqn = self._resolve_simple(clean, pkg, imports)
+                if type_fqn and type_fqn in self.classes_by_fqn:
+                    type_info = self.classes_by_fqn[type_fqn]
+                    if type_info.get("is_interface", False):
+                        cls_node = interface_id(type_fqn)
+                    else:
+                        cls_node = class_id(type_fqn)
+                    self.add_edge(method_node, "Uses", cls_node)
+                    self.add_edge(cls_node, "UsedBy", method_node)
+            # return type
+            rtype = m.return_type
+            if rtype:
+                clean = rtype.replace("[]", "").strip()
+                type_fqn = self._resolve_simple(clean, pkg, imports)
+                if type_fqn and type_fqn in self.classes_by_fqn:
+                    type_info = self.classes_by_fqn[type_fqn]
+                    if type_info.get("is_interface", False):
+                        cls_node = interface_id(type_fqn)
+                    else:
+                        cls_node = class_id(type_fqn)
+                    self.add_edge(method_node, "Uses", cls_node)
+                    self.add_edge(cls_node, "UsedBy", method_node)
+
+        # 3) Field types (per class)
+        for field in sym.get("fields", []) or []:
+            owner_class = class_id(field["owner_fqn"]) if field.get("owner_fqn") else None
+            ftype = field.get("type")
+            if not owner_class or not ftype:
+                continue
+            clean = ftype.replace("[]", "").strip()
+            type_fqn = self._resolve_simple(clean, pkg, imports)
+            if type_fqn and type_fqn in self.classes_by_fqn:
+                type_info = self.classes_by_fqn[type_fqn]
+                if type_info.get("is_interface", False):
+                    cls_node = interface_id(type_fqn)
+                else:
+                    cls_node = class_id(type_fqn)
+                self.add_edge(owner_class, "Uses", cls_node)
+                self.add_edge(cls_node, "UsedBy", owner_class)
+
+    # ---- stage 6: strongly connected components / dependency cycles ----
+    def stage6_cycles(self, labels=CYCLE_LABELS):
+        """
+        Find dependency cycles between methods, classes and packages.
+
+        Runs an iterative Tarjan pass over the graph's CSR adjacency, keeping
+        only `labels` edges. For the class and package levels each edge is
+        lifted to the owning class/package of its endpoints while it is
+        walked, so no second adjacency is built. Cyclic components (more than
+        one member, or a directly recursive method) land in self.cycles as
+        {level: [{"id", "size", "members"}]}, largest first, and their member
+        nodes get metadata["scc"] = that id (e.g. "class-scc-0").
+        """
+        # what every graph node belongs to at each level
+        method_of, class_of, package_of = [], [], []
+        for nid in self.graph.node_ids:
+            kind, _, rest = nid.partition(":")
+            if kind == "method":
+                fqn = rest.split("#", 1)[0]
+            elif kind == "constructor":
+                fqn = rest.split("::", 1)[0]
+            elif kind in ("class", "interface"):
+                fqn = rest
+            else:
+                fqn = None
+            info = self.classes_by_fqn.get(fqn) if fqn else None
+            method_of.append(nid if kind in ("method", "constructor") else None)
+            class_of.append(info["node_id"] if info else None)
+            package_of.append(module_id(info["pkg"]) if info else nid if kind == "module" else None)
+
+        codes = {self.graph.label_code(l) for l in labels if l in self.graph.labels}
+        self.cycles = {
+            "method": self._level_cycles("method", method_of, codes, self_loops=True),
+            "class": self._level_cycles("class", class_of, codes),
+            "package": self._level_cycles("package", package_of, codes),
+        }
+
+        scc_of = {m: c["id"] for level in self.cycles.values() for c in level for m in c["members"]}
+        for node in self.nodes:
+            meta = node.setdefault("metadata", {})
+            meta.pop("scc", None)
+            if node["id"] in scc_of:
+                meta["scc"] = scc_of[node["id"]]
+        return self.cycles
+
+    def _level_cycles(self, level, group_of, codes, self_loops=False):
+        """Cyclic components after merging graph nodes into group_of[v] (None drops v)."""
+        graph = self.graph
+        offsets, positions = graph.csr("out")
+        dst, label = graph.dst, graph.label
+        names, members, index = [], [], {}
+        slot = array("l", [-1]) * len(group_of)
+        for v, name in enumerate(group_of):
+            if name is None:
+                continue
+            g = index.get(name)
+            if g is None:
+                g = index[name] = len(names)
+                names.append(name)
+                members.append([])
+            members[g].append(v)
+            slot[v] = g
+
+        looped = set()
+        def successors(g):
+            for v in members[g]:
+                for p in positions[offsets[v]:offsets[v + 1]]:
+                    if label[p] in codes:
+                        h = slot[dst[p]]
+                        if h == g:
+                            looped.add(g)
+                        elif h != -1:
+                            yield h
+
+        comp, count = strongly_connected_components(len(names), successors)
+        components = [[] for _ in range(count)]
+        for g, c in enumerate(comp):
+            components[c].append(g)
+        cyclic = sorted(
+            (sorted(names[g] for g in gs) for gs in components
+             if len(gs) > 1 or (self_loops and gs[0] in looped)),
+            key=lambda ms: (-len(ms), ms[0]),
+        )
+        return [{"id": f"{level}-scc-{i}", "size": len(ms), "members": ms}
+                for i, ms in enumerate(cyclic)]
+
+    # ---- incremental updates ----
+    def update_files(self, files, changed=(), removed=(), workers=None):
+        """
+        Bring the graph up to date after some files changed.
+
+        `files` is the complete current list of file summaries; `changed` and
+        `removed` are the paths that differ from self.files. Symbol tables are
+        rebuilt from the summaries (no parsing), but nodes and edges are only
+        recomputed for the changed files and the files that depend on them:
+        subclasses of any type they declare(d), and files that mention one of
+        those types by name. Needs an Analyzer built with track_origins=True.
+        workers is passed on to resolve_files().
+        """
+        if self.edge_origins is None:
+            raise ValueError("update_files() requires Analyzer(track_origins=True)")
+        if self.dispatch != "static":
+            raise ValueError("update_files() only supports dispatch=\"static\"")
+        changed, removed = set(changed), set(removed)
+        old_by_path = {f["path"]: f for f in self.files}
+        new_by_path = {f["path"]: f for f in files}
+        touched = {
+            t["fqn"]
+            for p in changed | removed
+            for f in (old_by_path.get(p), new_by_path.get(p)) if f
+            for t in f["symbols"]["types"]
+        }
+        old_subtypes = self._subtype_map()
+
+        if self.referrers is None:
+            self.build_referrers()
+        for p in changed | removed:
+            if p in old_by_path:
+                for name in referenced_names(old_by_path[p]["symbols"]):
+                    self.referrers.discard(name, p)
+            if p in new_by_path:
+                for name in referenced_names(new_by_path[p]["symbols"]):
+                    self.referrers.add(name, p)
+        self.files = files
+        self.rebuild_symbols()
+        new_subtypes = self._subtype_map()
+
+        # touched types and everything that inherits from them, before or after
+        stack = list(touched)
+        while stack:
+            fqn = stack.pop()
+            for sub in old_subtypes.get(fqn, set()) | new_subtypes.get(fqn, set()):
+                if sub not in touched:
+                    touched.add(sub)
+                    stack.append(sub)
+        # files declaring or mentioning any of them by simple name
+        affected = set(changed)
+        for fqn in touched:
+            affected |= self.referrers.paths(fqn.rsplit(".", 1)[-1])
+
+        # drop everything the affected files contributed
+        drop = affected | removed
+        dropped = []
+        for path in drop:
+            dropped += self.edge_origins.drop(path)
+        self.graph.remove(dropped)
+        self.nodes = [n for n in self.nodes if n.get("metadata", {}).get("file_path") not in drop]
+
+        # and recompute it
+        redo = [f for f in files if f["path"] in affected]
+        for f in redo:
+            self._syntactic_file(f)
+        for fqn, info in self.classes_by_fqn.items():
+            if info["path"] in affected:
+                self._cha_class(fqn, info)
+                self._implements_class(fqn, info)
+        for m in self.methods.values():
+            owner_info = self.classes_by_fqn.get(m.owner_fqn)
+            if owner_info and owner_info["path"] in affected:
+                self._overrides_method(m)
+        self.resolve_files(redo, workers)
+        return affected
+
+    def build_referrers(self):
+        """Index self.files by the names they reference or declare (self.referrers)."""
+        self.referrers = Referrers()
+        for f in self.files:
+            for name in referenced_names(f["symbols"]):
+                self.referrers.add(name, f["path"])
+
+    def rebuild_symbols(self):
+        """Recompute symbol tables and the class hierarchy from self.files, without edges."""
+        self.classes_by_fqn.clear()
+        self.classes_by_simple.clear()
+        self._resolve_memo.clear()
+        self.methods.clear()
+        self.methods_index.clear()
+        self.parents.clear()
+        self._hierarchy_changed()
+        self.stage2_build_symbols()
+        for fqn, info in self.classes_by_fqn.items():
+            self._cha_class(fqn, info, add_edges=False)
+
+    def _subtype_map(self):
+        """fqn -> {direct subclasses and implementing classes}"""
+        children = defaultdict(set)
+        for fqn, base in self.parents.items():
+            children[base].add(fqn)
+        for fqn, info in self.classes_by_fqn.items():
+            for interface_simple in info.get("implements", []):
+                interface_fqn = self._resolve_simple(interface_simple, info["pkg"], info.get("imports"))
+                if interface_fqn:
+                    children[interface_fqn].add(fqn)
+        return children
+
+    def _hierarchy_changed(self):
+        """Forget memoized ancestor chains and method lookups."""
+        if self._hierarchy_memo or self._lookup_memo:
+            self._hierarchy_memo.clear()
+            self._lookup_memo.clear()
+
+    def _hierarchy(self, fqn):
+        """
+        (superclass chain, implemented interfaces) of fqn, nearest first.
+
+        The interfaces are those implemented by fqn and then by each of its
+        superclasses, resolved once and memoized until the hierarchy changes.
+        """
+        hit = self._hierarchy_memo.get(fqn)
+        if hit is None:
+            supers, seen = [], {fqn}
+            cur = self.parents.get(fqn)
+            while cur and cur not in seen:  # tolerate (broken) cyclic extends
+                supers.append(cur)
+                seen.add(cur)
+                cur = self.parents.get(cur)
+            interfaces = []
+            for owner in [fqn] + supers:
+                info = self.classes_by_fqn.get(owner)
+                if not info or info.get("is_interface", False):
+                    continue
+                for interface_simple in info.get("implements", []):
+                    interface_fqn = self._resolve_simple(interface_simple, info["pkg"], info.get("imports"))
+                    if interface_fqn and interface_fqn not in interfaces:
+                        interfaces.append(interface_fqn)
+            hit = self._hierarchy_memo[fqn] = (tuple(supers), tuple(interfaces))
+        return hit
 
     def _lookup_method(self, owner_fqn, name, arity):
-        node = self.methods_index.get((owner_fqn, name, arity))
+        key = (owner_fqn, name, arity)
+        node = self.methods_index.get(key)
         if node: return node
-        for anc in self._ancestors(owner_fqn):
+        if key in self._lookup_memo:
+            return self._lookup_memo[key]
+        supers, interfaces = self._hierarchy(owner_fqn)
+        for anc in supers + interfaces:
             node = self.methods_index.get((anc, name, arity))
-            if node: return node
-        return None
+            if node: break
+        self._lookup_memo[key] = node
+        return node
+
+
+# ---- resolve_files() pool workers ----
+_worker_analyzer = None
+_worker_files = None
+
+def _init_resolver(tables, files):
+    global _worker_analyzer, _worker_files
+    *tables, dispatch = tables
+    an = Analyzer(dispatch=dispatch)
+    an.classes_by_fqn, an.classes_by_simple, an.methods_index, an.parents = tables
+    _worker_analyzer, _worker_files = an, files
+
+def _resolve_in_worker(i):
+    """
+    Edges stages 4 and 5 produce for file i, as (src, label, dst, resolved)
+    tuples, and the virtual call sites stage 4b needs (None if not tracked).
+    """
+    an = _worker_analyzer
+    an.graph = GraphStore()
+    if an.call_sites is not None:
+        an.call_sites = []
+    an._resolve_file(_worker_files[i])
+    g = an.graph
+    edges = [(g.node_ids[s], g.labels[l], g.node_ids[d], bool(r))
+             for s, l, d, r in zip(g.src, g.label, g.dst, g.resolved)]
+    return edges, an.call_sites
@@ -0,0 +1,41 @@
+"""
+Persistent cache for LLM function descriptions.
+
+Entries are keyed by a hash of (model, prompt version, class source, class
+name, package) and hold the parsed descriptions as plain dicts, so re-running
+the knowledge graph or a migration on unchanged code makes no API calls.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils.blob_store import BlobStore
+
+
+class DescriptionCache:
+    def __init__(self, path: str | Path, max_bytes: int = 256 * 1024 * 1024,
+                 ttl: Optional[float] = None):
+        """
+        Args:
+            path: SQLite database file (created on first use)
+            max_bytes: Evict least recently used entries beyond this many stored bytes
+            ttl: Optional lifetime in seconds after which entries are re-requested
+        """
+        self.store = BlobStore(path, max_bytes=max_bytes, ttl=ttl)
+
+    @staticmethod
+    def key(model: str, prompt_version: int, java_code: str, class_name: str, package: str) -> str:
+        payload = json.dumps([model, prompt_version, class_name, package, java_code],
+                             ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        return self.store.get_json(key)
+
+    def put(self, key: str, descriptions: List[Dict]) -> None:
+        self.store.put_json(key, descriptions)
+
+    def stats(self) -> dict:
+        return self.store.stats()
@@ -0,0 +1,73 @@
+"""
+Graph algorithms over integer node indices.
+
+Written iteratively (explicit stacks, array-backed state) so they run on
+graphs with millions of nodes and edges without hitting the recursion limit.
+"""
+
+from array import array
+from typing import Callable, Iterable, List, Tuple
+
+
+def strongly_connected_components(
+    n: int, successors: Callable[[int], Iterable[int]]
+) -> Tuple[array, int]:
+    """
+    Tarjan's algorithm over nodes 0..n-1.
+
+    Returns (comp, count): comp[v] is the component number of node v.
+    Components are numbered in reverse topological order of the condensation,
+    so every edge between two components goes from a higher number to a
+    lower one.
+    """
+    index = array("l", [-1]) * n
+    low = array("l", [0]) * n
+    comp = array("l", [-1]) * n
+    on_stack = bytearray(n)
+    stack: List[int] = []
+    counter = count = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        work = [(root, iter(successors(root)))]
+        while work:
+            v, it = work[-1]
+            for w in it:
+                if index[w] == -1:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = 1
+                    work.append((w, iter(successors(w))))
+                    break
+                if on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+            else:
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    if low[v] < low[u]:
+                        low[u] = low[v]
+                if low[v] == index[v]:
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = 0
+                        comp[w] = count
+                        if w == v:
+                            break
+                    count += 1
+    return comp, count
+
+
+def iter_bits(bits: int) -> Iterable[int]:
+    """Positions of the set bits of a non-negative int, ascending."""
+    s = bin(bits)[:1:-1]  # least significant bit first
+    i = s.find("1")
+    while i != -1:
+        yield i
+        i = s.find("1", i + 1)
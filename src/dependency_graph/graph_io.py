@@ -0,0 +1,79 @@
+"""
+Streaming JSONL I/O for dependency graph nodes and edges.
+
+Writers consume any iterable and readers yield one record per line, so a graph
+never has to exist as one big string in memory. Files ending in .gz are
+gzip-framed; .zst uses the optional `zstandard` package.
+"""
+
+import gzip
+import io
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+GRAPH_SUFFIXES = (".jsonl", ".jsonl.gz", ".jsonl.zst")
+
+
+def open_text(path: str | Path, mode: str = "r"):
+    """Open a text file, transparently (de)compressing by suffix."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if path.suffix == ".zst":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("Reading or writing .zst graphs requires `pip install zstandard`") from e
+        if mode == "r":
+            stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(open(path, "wb"), closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class JsonlWriter:
+    """Append records to a JSONL file one at a time; use as a context manager."""
+
+    def __init__(self, path: str | Path):
+        self._f = open_text(path, "w")
+        self.count = 0
+
+    def write(self, item: Dict) -> None:
+        self._f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_jsonl(path: str | Path, items: Iterable[Dict]) -> int:
+    """Stream items to path, one JSON object per line. Returns the count."""
+    with JsonlWriter(path) as w:
+        for it in items:
+            w.write(it)
+    return w.count
+
+
+def iter_jsonl(path: str | Path) -> Iterator[Dict]:
+    """Lazily yield one record per non-empty line of path."""
+    with open_text(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def find_graph_file(directory: str | Path, stem: str) -> Optional[Path]:
+    """Locate <stem>.jsonl in directory, plain or compressed."""
+    for suffix in GRAPH_SUFFIXES:
+        p = Path(directory) / f"{stem}{suffix}"
+        if p.exists():
+            return p
+    return None
@@ -0,0 +1,239 @@
+"""
+Compact in-memory edge storage for the dependency graph.
+
+Node IDs are interned to integer indices and edge labels to small integer
+codes; src/dst/label/resolved live in parallel `array` columns, and edges are
+deduplicated on a single packed integer key. A CSR adjacency is built on
+demand. A store can be rebuilt from its columns in bulk, in which case
+the key set is only rebuilt once the store is queried or mutated.
+EdgeListView keeps the old list-of-dicts shape available for callers that
+iterate or index `Analyzer.edges`.
+"""
+
+from array import array
+from collections.abc import Sequence
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+EDGE_LABELS = (
+    "ParentOf", "ChildOf",
+    "BaseClassOf", "DerivedClassOf",
+    "Overrides", "OverriddenBy",
+    "Implements", "ImplementedBy",
+    "Calls", "CalledBy",
+    "Instantiates", "InstantiatedBy",
+    "Uses", "UsedBy",
+)
+
+_DST_BITS = 32
+_LABEL_BITS = 8
+
+
+class GraphStore:
+    def __init__(self):
+        self.node_ids: List[str] = []        # index -> node id
+        self._node_index: Dict[str, int] = {}
+        self.labels: List[str] = list(EDGE_LABELS)
+        self._label_index = {l: i for i, l in enumerate(self.labels)}
+
+        self.src = array("I")
+        self.dst = array("I")
+        self.label = array("B")
+        self.resolved = array("B")
+        # packed (src, label, dst) keys; from_columns() leaves this None until needed
+        self._keys = set()
+        self._pos = None                     # packed key -> edge index, built on first use
+        self._csr = {}
+
+    # ---- interning ----
+    def intern(self, node_id: str) -> int:
+        idx = self._node_index.get(node_id)
+        if idx is None:
+            idx = self._node_index[node_id] = len(self.node_ids)
+            self.node_ids.append(node_id)
+        return idx
+
+    def node_index(self, node_id: str) -> Optional[int]:
+        return self._node_index.get(node_id)
+
+    def label_code(self, label: str) -> int:
+        code = self._label_index.get(label)
+        if code is None:
+            if len(self.labels) >= 1 << _LABEL_BITS:
+                raise ValueError(f"too many distinct edge labels (adding {label!r})")
+            code = self._label_index[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+    def key(self, src: str, label: str, dst: str) -> int:
+        """Packed integer key for an edge (interns its endpoints)."""
+        return self.pack(self.intern(src), self.label_code(label), self.intern(dst))
+
+    @staticmethod
+    def pack(s: int, l: int, d: int) -> int:
+        """Packed key of (src index, label code, dst index)."""
+        return (((s << _LABEL_BITS) | l) << _DST_BITS) | d
+
+    @staticmethod
+    def unpack(key: int) -> Tuple[int, int, int]:
+        """(src index, label code, dst index) of a packed key."""
+        d = key & ((1 << _DST_BITS) - 1)
+        key >>= _DST_BITS
+        return key >> _LABEL_BITS, key & ((1 << _LABEL_BITS) - 1), d
+
+    def _key_set(self) -> set:
+        if self._keys is None:
+            self._keys = set(map(self.pack, self.src, self.label, self.dst))
+        return self._keys
+
+    # ---- edges ----
+    def add_edge(self, src: str, label: str, dst: str, resolved: bool = True) -> bool:
+        """Append an edge unless it already exists; returns True if added."""
+        s, l, d = self.intern(src), self.label_code(label), self.intern(dst)
+        k = self.pack(s, l, d)
+        keys = self._keys if self._keys is not None else self._key_set()
+        if k in keys:
+            return False
+        keys.add(k)
+        if self._pos is not None:
+            self._pos[k] = len(self.src)
+        self.src.append(s)
+        self.dst.append(d)
+        self.label.append(l)
+        self.resolved.append(1 if resolved else 0)
+        self._csr.clear()
+        return True
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._key_set()
+
+    def __len__(self) -> int:
+        return len(self.src)
+
+    def edge_key(self, i: int) -> int:
+        return self.pack(self.src[i], self.label[i], self.dst[i])
+
+    def edge(self, i: int) -> Dict:
+        return {
+            "src": self.node_ids[self.src[i]],
+            "label": self.labels[self.label[i]],
+            "dst": self.node_ids[self.dst[i]],
+            "resolved": bool(self.resolved[i]),
+        }
+
+    def iter_edges(self) -> Iterator[Dict]:
+        for i in range(len(self.src)):
+            yield self.edge(i)
+
+    def _positions(self) -> Dict[int, int]:
+        if self._pos is None:
+            self._pos = dict(zip(map(self.pack, self.src, self.label, self.dst),
+                                 range(len(self.src))))
+        return self._pos
+
+    def is_resolved(self, key: int) -> bool:
+        """Resolved flag of the edge with packed key (which must exist)."""
+        return bool(self.resolved[self._positions()[key]])
+
+    def remove(self, keys: Iterable[int]) -> None:
+        """
+        Drop the edges with the given packed keys.
+
+        The last edge moves into each freed slot, so this costs O(len(keys))
+        once the key -> index map exists (built on the first call), at the
+        price of not keeping the remaining edges in insertion order.
+        """
+        drop = set(keys) & self._key_set()
+        if not drop:
+            return
+        self._positions()
+        cols = (self.src, self.dst, self.label, self.resolved)
+        for k in drop:
+            i, last = self._pos.pop(k), len(self.src) - 1
+            if i != last:
+                self._pos[self.edge_key(last)] = i
+                for col in cols:
+                    col[i] = col[last]
+            for col in cols:
+                col.pop()
+        self._keys -= drop
+        self._csr.clear()
+
+    def clear(self) -> None:
+        self.__init__()
+
+    # ---- persistence ----
+    COLUMNS = ("src", "dst", "label", "resolved")
+
+    @classmethod
+    def from_columns(cls, node_ids: List[str], labels: List[str],
+                     columns: Dict[str, array], keys: Optional[set] = None) -> "GraphStore":
+        """
+        Rebuild a store in bulk from node_ids, labels and one array per
+        COLUMNS entry. keys is the packed key set, if the caller has it.
+        """
+        g = cls()
+        g.node_ids = list(node_ids)
+        g._node_index = dict(zip(g.node_ids, range(len(g.node_ids))))
+        g.labels = list(labels)
+        g._label_index = {l: i for i, l in enumerate(g.labels)}
+        for name in cls.COLUMNS:
+            setattr(g, name, columns[name])
+        g._keys = keys
+        return g
+
+    # ---- adjacency ----
+    def csr(self, direction: str = "out") -> Tuple[array, array]:
+        """
+        Compressed sparse row adjacency over node indices.
+
+        Returns (offsets, edge_positions): the edges leaving (direction="out")
+        or entering ("in") node n are edge_positions[offsets[n]:offsets[n+1]],
+        in insertion order. Cached until the next mutation.
+        """
+        if direction not in self._csr:
+            keys = self.src if direction == "out" else self.dst
+            n = len(self.node_ids)
+            offsets = array("Q", bytes(8 * (n + 1)))
+            for k in keys:
+                offsets[k + 1] += 1
+            for i in range(n):
+                offsets[i + 1] += offsets[i]
+            fill = array("Q", offsets[:-1])
+            positions = array("I", bytes(4 * len(keys)))
+            for i, k in enumerate(keys):
+                positions[fill[k]] = i
+                fill[k] += 1
+            self._csr[direction] = (offsets, positions)
+        return self._csr[direction]
+
+    def neighbors(self, node_id: str, direction: str = "out") -> Iterator[Tuple[str, str]]:
+        """Yield (label, other node id) for edges leaving/entering node_id."""
+        idx = self._node_index.get(node_id)
+        if idx is None:
+            return
+        offsets, positions = self.csr(direction)
+        other = self.dst if direction == "out" else self.src
+        for p in positions[offsets[idx]:offsets[idx + 1]]:
+            yield self.labels[self.label[p]], self.node_ids[other[p]]
+
+
+class EdgeListView(Sequence):
+    """Read-only list-of-dicts view over a GraphStore (dicts built on access)."""
+
+    def __init__(self, store: GraphStore):
+        self._store = store
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._store.edge(j) for j in range(*i.indices(len(self._store)))]
+        if i < 0:
+            i += len(self._store)
+        if not 0 <= i < len(self._store):
+            raise IndexError("edge index out of range")
+        return self._store.edge(i)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return self._store.iter_edges()
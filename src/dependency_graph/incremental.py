@@ -0,0 +1,280 @@
+"""
+Incremental re-analysis keyed on file content hashes.
+
+A cache directory keeps one BlobStore (state.db) between runs, with a row
+per file instead of whole-repo documents, so a run only rewrites what changed:
+- parse:<path>: {sha256, size, mtime_ns, parse_file output}
+- nodes:<path>, edges:<path>: the nodes a file produced and the edges it
+  produced, as (src, label, dst, resolved) quads of node indices and label codes
+- refs:<name>: the files that reference or declare a simple name
+- graph:node_ids:<start>, graph:labels: the node id and label tables the
+  edge rows index into; node ids are append-only, saved in chunks
+
+On the next run only files whose content hash changed are re-parsed, and
+Analyzer.update_files() recomputes just the nodes and edges contributed by
+those files and their dependents. Saving then writes only those files'
+rows, the names they reference and the new node ids; a run that finds
+nothing changed writes nothing. Loading still reads every node and edge row
+to assemble the full graph.
+"""
+
+import hashlib
+import json
+import os
+from array import array
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from dependency_graph.analyzer import parse_files
+from dependency_graph.dependency_analyzer import Analyzer, EdgeOrigins, Referrers
+from dependency_graph.graph_store import GraphStore
+from dependency_graph.java_parser import decode_symbols, grammar_version, json_default
+from utils.blob_store import BlobStore
+from utils.file_utils import find_files
+
+STATE_DB = "state.db"
+# whole-repo JSON documents written by earlier versions
+LEGACY_FILES = ("parse_index.json", "graph_state.json")
+# Bump whenever Analyzer output changes so stale graph state is rebuilt.
+STATE_VERSION = 6
+
+
+class IndexDelta(NamedTuple):
+    files: List[Dict]       # current parse results, in sorted path order
+    previous: List[Dict]    # parse results from the last run
+    changed: Set[str]       # new or modified paths
+    removed: Set[str]       # paths that no longer exist
+
+
+def open_state(cache_dir: str | Path) -> BlobStore:
+    """The state store in cache_dir; never evicts, since every row is needed."""
+    cache_dir = Path(cache_dir)
+    for name in LEGACY_FILES:
+        (cache_dir / name).unlink(missing_ok=True)
+    return BlobStore(cache_dir / STATE_DB, max_bytes=None)
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"),
+                      default=json_default).encode("utf-8")
+
+
+def _edge_bytes(graph: GraphStore, keys: Iterable[int]) -> bytes:
+    quads = array("I")
+    for key in keys:
+        quads.extend(GraphStore.unpack(key))
+        quads.append(graph.is_resolved(key))
+    return quads.tobytes()
+
+
+def _quads(raw: Optional[bytes]) -> array:
+    quads = array("I")
+    if raw:
+        quads.frombytes(raw)
+    return quads
+
+
+def _keys_from(raw: Optional[bytes]) -> Iterable[int]:
+    quads = _quads(raw)
+    return map(GraphStore.pack, quads[0::4], quads[1::4], quads[2::4])
+
+
+def _meta(store: BlobStore, name: str):
+    # read with scan(): get() would record the access and so write on every run
+    for _, raw in store.scan(f"meta:{name}"):
+        return json.loads(raw)
+    return None
+
+
+class ParseIndex:
+    """Persistent path -> (content hash, parse result) rows for one grammar version."""
+
+    def __init__(self, cache_dir: str | Path):
+        self.store = open_state(cache_dir)
+        self.grammar = grammar_version()
+        self.entries: Dict[str, Dict] = {}
+        self._dirty: Set[str] = set()     # paths whose row needs writing
+        self._removed: Set[str] = set()   # paths whose row needs deleting
+        self._meta_stale = _meta(self.store, "parse") != self.grammar
+        if not self._meta_stale:
+            for key, raw in self.store.scan("parse:"):
+                entry = self.entries[key[len("parse:"):]] = json.loads(raw)
+                decode_symbols(entry["result"]["symbols"])
+        else:
+            self._removed = {key[len("parse:"):] for key in self.store.keys("parse:")}
+
+    def refresh(self, repo_path: str | Path, workers: Optional[int] = None,
+                parse_cache=None, excludes: Iterable[str] = (), use_git: bool = False) -> IndexDelta:
+        """Re-parse files whose content changed since the last refresh."""
+        previous = [e["result"] for e in self.entries.values()]
+        entries, stale = {}, []
+        for p in find_files(repo_path, (".java",), excludes=excludes, use_git=use_git):
+            key = str(p)
+            st = os.stat(p)
+            old = self.entries.get(key)
+            # unchanged size+mtime means the stored hash still holds
+            if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+                entries[key] = old
+                continue
+            sha = hashlib.sha256(Path(p).read_bytes()).hexdigest()
+            entry = {"sha256": sha, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+            if old and old["sha256"] == sha:
+                entry["result"] = old["result"]
+            else:
+                stale.append(key)
+            entries[key] = entry
+            self._dirty.add(key)
+
+        for key, result in zip(stale, parse_files([Path(k) for k in stale], workers, parse_cache)):
+            entries[key]["result"] = result
+
+        removed = set(self.entries) - set(entries)
+        self._removed |= removed
+        self.entries = entries
+        return IndexDelta(
+            files=[e["result"] for e in entries.values()],
+            previous=previous,
+            changed=set(stale),
+            removed=removed,
+        )
+
+    def save(self) -> None:
+        """Write the rows that changed since loading (nothing, if none did)."""
+        rows = [(f"parse:{key}", _dumps(self.entries[key])) for key in sorted(self._dirty)]
+        if self._meta_stale:
+            rows.append(("meta:parse", _dumps(self.grammar)))
+        if rows or self._removed:
+            self.store.update(rows, delete=[f"parse:{key}" for key in sorted(self._removed - self._dirty)])
+        self._dirty, self._removed, self._meta_stale = set(), set(), False
+
+
+def save_state(an: Analyzer, store: BlobStore, paths: Optional[Iterable[str]] = None) -> None:
+    """
+    Persist a track_origins Analyzer: the nodes and edges of `paths`, the
+    referrers that changed and any newly interned node ids. With paths=None
+    every file is written, replacing whatever state was stored.
+    """
+    g = an.graph
+    current = {f["path"] for f in an.files}
+    if an.referrers is None:
+        an.build_referrers()
+    if paths is None:
+        paths, saved = current, [0, 0]
+        delete = [key for prefix in ("nodes:", "edges:", "refs:", "graph:") for key in store.keys(prefix)]
+    else:
+        paths, saved = set(paths), _meta(store, "graph")[2:]
+        delete = []
+
+    nodes = defaultdict(list)
+    for n in an.nodes:
+        path = n.get("metadata", {}).get("file_path")
+        if path in paths:
+            nodes[path].append(n)
+    rows = []
+    for path in sorted(paths):
+        if path in current:
+            rows.append((f"nodes:{path}", _dumps(nodes[path])))
+            rows.append((f"edges:{path}", _edge_bytes(g, an.edge_origins.keys(path))))
+        else:
+            delete += [f"nodes:{path}", f"edges:{path}"]
+    for name in sorted(an.referrers.dirty):
+        referring = an.referrers.paths(name)
+        if referring:
+            rows.append((f"refs:{name}", _dumps(sorted(referring))))
+        else:
+            delete.append(f"refs:{name}")
+    an.referrers.dirty.clear()
+
+    # node ids are only ever appended, so each save adds the new tail as a chunk
+    counts = [len(g.node_ids), len(g.labels)]
+    if counts[0] > saved[0]:
+        rows.append((f"graph:node_ids:{saved[0]:010d}", _dumps(g.node_ids[saved[0]:])))
+    if counts[1] != saved[1]:
+        rows.append(("graph:labels", _dumps(g.labels)))
+    if counts != saved:
+        rows.append(("meta:graph", _dumps([STATE_VERSION, grammar_version(), *counts])))
+    store.update(rows, delete=delete)
+
+
+def load_state(store: BlobStore, files: List[Dict]) -> Optional[Analyzer]:
+    """
+    Rebuild an Analyzer from save_state() output; None if missing or stale.
+
+    The graph is the union of the per-file edge rows, so an edge produced by
+    several files is kept once and counted in EdgeOrigins.shared. Referrers
+    and each file's edge keys are only read when update_files() asks.
+    """
+    meta = _meta(store, "graph")
+    if meta is None or meta[:2] != [STATE_VERSION, grammar_version()]:
+        return None
+    node_ids = [node for _, raw in store.scan("graph:node_ids:") for node in json.loads(raw)]
+    labels = json.loads(next(raw for _, raw in store.scan("graph:labels")))
+
+    quads = _quads(b"".join(raw for _, raw in store.scan("edges:")))
+    keys = list(map(GraphStore.pack, quads[0::4], quads[1::4], quads[2::4]))
+    unique = set(keys)
+    shared = {}
+    if len(unique) < len(keys):
+        shared = {key: n for key, n in Counter(keys).items() if n > 1}
+        kept, seen = array("I"), set()
+        for i, key in enumerate(keys):
+            if key not in seen:
+                seen.add(key)
+                kept.extend(quads[4 * i:4 * i + 4])
+        quads = kept
+    columns = {
+        "src": quads[0::4],
+        "dst": quads[2::4],
+        "label": array("B", quads[1::4]),
+        "resolved": array("B", quads[3::4]),
+    }
+
+    an = Analyzer(track_origins=True)
+    an.edge_origins = EdgeOrigins(load=lambda path: _keys_from(store.get(f"edges:{path}")),
+                                  shared=shared)
+    an.graph = GraphStore.from_columns(node_ids, labels, columns, keys=unique)
+    an.referrers = Referrers(load=lambda name: json.loads(store.get(f"refs:{name}") or b"[]"))
+    an.files = files
+    an.nodes = [n for _, raw in store.scan("nodes:") for n in json.loads(raw)]
+    an.rebuild_symbols()
+    return an
+
+
+def analyze_incremental(
+    repo_path: str | Path,
+    cache_dir: str | Path,
+    workers: Optional[int] = None,
+    parse_cache=None,
+    excludes: Iterable[str] = (),
+    use_git: bool = False,
+) -> Analyzer:
+    """
+    Analyze repo_path, reusing parse results and graph state from cache_dir.
+
+    The first run (or a run after a grammar/analyzer version bump) does a full
+    analysis; later runs only redo the files affected by what changed.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    index = ParseIndex(cache_dir)
+    delta = index.refresh(repo_path, workers, parse_cache, excludes, use_git)
+
+    an = load_state(index.store, delta.previous)
+    if an is None:
+        an = Analyzer(track_origins=True)
+        an.files = delta.files
+        an.run(workers=workers)
+        save_state(an, index.store)
+        print(f"Incremental cache: full analysis of {len(delta.files)} files")
+    elif delta.changed or delta.removed:
+        affected = an.update_files(delta.files, delta.changed, delta.removed, workers)
+        save_state(an, index.store, affected | delta.removed)
+        print(f"Incremental cache: {len(delta.changed)} changed, {len(delta.removed)} removed, "
+              f"{len(affected)} files re-analyzed")
+    else:
+        an.files = delta.files
+        print("Incremental cache: no changes")
+
+    index.save()
+    return an
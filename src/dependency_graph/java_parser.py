@@ -1,11 +1,23 @@
 from tree_sitter import Language, Parser
 from pathlib import Path
-import json, sys
+from array import array
+from bisect import bisect_right
+import hashlib, json, sys, threading
 
 _LANG_SO = Path("build/languages.so")
 _JAVA_REPO = Path("build/tree-sitter-java")
 
-def get_java_parser() -> Parser:
+# Bump whenever parse_file's output changes shape so cached results are dropped.
+PARSER_VERSION = 4
+
+# Loaded once per process; Parser objects are not thread-safe, so each thread
+# (or pool worker) keeps its own instance bound to the shared Language.
+_LANGUAGE = None
+_LANGUAGE_GEN = 0  # bumped by reset_parser_cache() to retire per-thread parsers
+_LANGUAGE_LOCK = threading.Lock()
+_local = threading.local()
+
+def _build_language() -> Language:
     if not _LANG_SO.exists():
         _JAVA_REPO.mkdir(parents=True, exist_ok=True)
         # shallow clone if not present
@@ -15,27 +27,186 @@ def get_java_parser() -> Parser:
                             "https://github.com/tree-sitter/tree-sitter-java",
                             str(_JAVA_REPO)], check=True)
         Language.build_library(str(_LANG_SO), [str(_JAVA_REPO)])
+    return Language(str(_LANG_SO), "java")
 
-    lang = Language(str(_LANG_SO), "java")
-    p = Parser()
-    p.set_language(lang)
+def get_java_language() -> Language:
+    global _LANGUAGE
+    if _LANGUAGE is None:
+        with _LANGUAGE_LOCK:
+            if _LANGUAGE is None:
+                _LANGUAGE = _build_language()
+    return _LANGUAGE
+
+def get_java_parser() -> Parser:
+    """Return this thread's Parser, creating it on first use."""
+    p = getattr(_local, "parser", None)
+    if p is None or _local.gen != _LANGUAGE_GEN:
+        p = Parser()
+        p.set_language(get_java_language())
+        _local.parser, _local.gen = p, _LANGUAGE_GEN
     return p
 
+def grammar_version() -> str:
+    """Identifies parse_file output: parser revision plus grammar ABI version."""
+    return f"{PARSER_VERSION}:{get_java_language().version}"
+
+def reset_parser_cache():
+    """Drop the cached Language and all per-thread Parsers (used by tests)."""
+    global _LANGUAGE, _LANGUAGE_GEN
+    with _LANGUAGE_LOCK:
+        _LANGUAGE = None
+        _LANGUAGE_GEN += 1
+
 def slice_text(src: bytes, node):
     return src[node.start_byte:node.end_byte].decode("utf-8")
 
-def byte_to_line(src: bytes, byte_pos: int) -> int:
-    """Convert byte position to 1-indexed line number"""
-    return src[:byte_pos].count(b'\n') + 1
+class LineIndex:
+    """Newline offsets for one source buffer, built once per file.
+
+    line_of() is a binary search, so computing line ranges for every type and
+    method stays linear in file size instead of rescanning the prefix.
+    """
+    __slots__ = ("newlines",)
+
+    def __init__(self, src: bytes):
+        self.newlines = array("I")
+        pos = src.find(b"\n")
+        while pos != -1:
+            self.newlines.append(pos)
+            pos = src.find(b"\n", pos + 1)
+
+    def line_of(self, byte_pos: int) -> int:
+        """Convert byte position to 1-indexed line number"""
+        return bisect_right(self.newlines, byte_pos - 1) + 1
+
+    def line_range(self, node) -> list[int]:
+        return [self.line_of(node.start_byte), self.line_of(node.end_byte)]
+
+    def line_count(self, size: int) -> int:
+        """Number of lines in a buffer of size bytes (a trailing newline ends the last one)."""
+        if not size:
+            return 0
+        last = self.newlines[-1] if self.newlines else -1
+        return len(self.newlines) + (1 if last != size - 1 else 0)
+
+class MethodRecord:
+    """One method declaration from parse_file().
+
+    Owner, name and parameter types are kept as parsed; the
+    "owner#name(params)" signature and the node id are only built when first
+    asked for. Indexing (m["name"], m.get("params")) and equality work as
+    they did on the plain dicts this replaces, and to_dict()/from_dict()
+    convert to and from that form for JSON.
+    """
+    __slots__ = ("owner_fqn", "name", "params", "return_type", "range", "line_range", "_node_id")
+    _KEYS = ("owner_fqn", "name", "sig", "range", "line_range", "node_id", "params", "return_type")
+
+    def __init__(self, owner_fqn, name, params, return_type=None, range=(0, 0), line_range=(1, 1)):
+        self.owner_fqn = owner_fqn
+        self.name = name
+        self.params = params
+        self.return_type = return_type
+        self.range = range
+        self.line_range = line_range
+        self._node_id = None
+
+    @property
+    def arity(self) -> int:
+        return len(self.params)
+
+    @property
+    def node_id(self) -> str:
+        if self._node_id is None:
+            self._node_id = f"method:{self.owner_fqn}#{self.name}({','.join(self.params)})"
+        return self._node_id
 
-def parse_file(path: str | Path):
+    @property
+    def sig(self) -> str:
+        return self.node_id[len("method:"):]
+
+    def __getitem__(self, key):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._KEYS else default
+
+    def __contains__(self, key):
+        return key in self._KEYS
+
+    def keys(self):
+        return self._KEYS
+
+    def __eq__(self, other):
+        # by content, against records or dicts, like the plain dicts (and unhashable too)
+        if isinstance(other, MethodRecord):
+            other = other.to_dict()
+        if not isinstance(other, dict):
+            return NotImplemented
+        return self.to_dict() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"MethodRecord({self.sig!r})"
+
+    def to_dict(self) -> dict:
+        return {k: getattr(self, k) for k in self._KEYS}
+
+    @classmethod
+    def from_dict(cls, d) -> "MethodRecord":
+        if isinstance(d, cls):
+            return d
+        return cls(d["owner_fqn"], d["name"], list(d.get("params") or []), d.get("return_type"),
+                   d.get("range", [0, 0]), d.get("line_range", [1, 1]))
+
+def encode_symbols(symbols: dict) -> dict:
+    """parse_file()["symbols"] with method records turned into plain dicts (for JSON)."""
+    return dict(symbols, methods=[m.to_dict() for m in symbols["methods"]])
+
+def decode_symbols(symbols: dict) -> dict:
+    """Inverse of encode_symbols(); converts the methods list in place."""
+    symbols["methods"] = [MethodRecord.from_dict(m) for m in symbols["methods"]]
+    return symbols
+
+def json_default(obj):
+    """json.dumps(default=...) hook for parse results holding MethodRecords."""
+    if isinstance(obj, MethodRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def parse_file(path: str | Path, cache=None, sources=None, data: bytes | None = None):
+    """Parse one Java file into its symbols summary.
+
+    cache, if given, is a ParseCache consulted by content hash before running
+    tree-sitter; fresh results are stored back into it. sources, if given, is
+    a SourceStore that keeps the bytes read here so later slicing of types
+    and methods doesn't read the file again. data is the file's content when
+    the caller has already read it.
+    """
     path = Path(path)
-    src_b = path.read_bytes()
+    src_b = path.read_bytes() if data is None else data
+    if sources is not None:
+        sources.put(str(path), src_b)
+    digest = hashlib.sha256(src_b).hexdigest()
+    if cache is not None:
+        symbols = cache.get(digest)
+        if symbols is not None:
+            return {"path": str(path), "symbols": decode_symbols(symbols)}
+        result = _parse_source(path, src_b, digest)
+        cache.put(digest, encode_symbols(result["symbols"]))
+        return result
+    return _parse_source(path, src_b, digest)
+
+def _parse_source(path: Path, src_b: bytes, digest: str):
     parser = get_java_parser()
     tree = parser.parse(src_b)
     root = tree.root_node
+    lines = LineIndex(src_b)
 
     pkg = None
+    imports = []  # "a.b.C" or "a.b.*"
     types = []
     methods = []
     fields = []
@@ -53,6 +224,16 @@ def parse_file(path: str | Path):
                     if child.type == "scoped_identifier":
                         pkg = slice_text(src_b, child).strip()
                         break
+        if ch.type == "import_declaration":
+            # static imports name members, not types
+            if any(c.type == "static" for c in ch.children):
+                continue
+            name = next((c for c in ch.children if c.type in ("scoped_identifier", "identifier")), None)
+            if name:
+                imp = slice_text(src_b, name).strip()
+                if any(c.type == "asterisk" for c in ch.children):
+                    imp += ".*"
+                imports.append(imp)
         if ch.type in ["class_declaration", "interface_declaration"]:
             is_interface = (ch.type == "interface_declaration")
             cls = ch
@@ -88,7 +269,7 @@ def parse_file(path: str | Path):
                 "implements": implements,
                 "is_interface": is_interface,
                 "range": [cls.start_byte, cls.end_byte],
-                "line_range": [byte_to_line(src_b, cls.start_byte), byte_to_line(src_b, cls.end_byte)],
+                "line_range": lines.line_range(cls),
                 "node_id": f"interface:{fqn}" if is_interface else f"class:{fqn}"
             })
 
@@ -109,22 +290,12 @@ def parse_file(path: str | Path):
                     # return type (may be None for constructors)
                     rtype_node = mem.child_by_field_name("type")
                     return_type = slice_text(src_b, rtype_node).strip() if rtype_node else None
-                    sig = ",".join(ps)
-                    mid = f"method:{fqn}#{mname}({sig})"
-                    methods.append({
-                        "owner_fqn": fqn,
-                        "name": mname,
-                        "sig": f"{fqn}#{mname}({sig})",
-                        "range": [mem.start_byte, mem.end_byte],
-                        "line_range": [byte_to_line(src_b, mem.start_byte), byte_to_line(src_b, mem.end_byte)],
-                        "node_id": mid,
-                        "params": ps,
-                        "return_type": return_type
-                    })
+                    methods.append(MethodRecord(fqn, mname, ps, return_type,
+                                                [mem.start_byte, mem.end_byte], lines.line_range(mem)))
                     # collect simple stmts inside body
                     block = mem.child_by_field_name("body")
                     if block:
-                        _collect_stmts(src_b, block, owner=mid, pkg=pkg, stmts=stmts)
+                        _collect_stmts(src_b, block, method=len(methods) - 1, pkg=pkg, stmts=stmts)
                 elif mem.type == "field_declaration":
                     # capture field declarations for type usage
                     ftype = mem.child_by_field_name("type")
@@ -144,15 +315,19 @@ def parse_file(path: str | Path):
         "path": str(path),
         "symbols": {
             "package": pkg or "<default>",
+            "imports": imports,
             "types": types,
             "methods": methods,
             "fields": fields,
             "stmts": stmts,
+            "line_count": lines.line_count(len(src_b)),
+            "sha256": digest,
         }
     }
 
-def _collect_stmts(src_b, node, owner, pkg, stmts):
-    # walk subtree recursively to find method_invocation, object_creation, local vars
+def _collect_stmts(src_b, node, method, pkg, stmts):
+    # walk subtree recursively to find method_invocation, object_creation, local vars;
+    # "method" is the index of the enclosing MethodRecord in symbols["methods"]
     stack = [node]
     while stack:
         n = stack.pop()
@@ -165,7 +340,7 @@ def _collect_stmts(src_b, node, owner, pkg, stmts):
                 name = slice_text(src_b, d.child_by_field_name("name"))
                 stmts.append({
                     "kind": "local",
-                    "owner_method": owner,
+                    "method": method,
                     "parts": {"name": name, "type": slice_text(src_b, t).strip()},
                     "range": [n.start_byte, n.end_byte]
                 })
@@ -173,7 +348,7 @@ def _collect_stmts(src_b, node, owner, pkg, stmts):
             t = n.child_by_field_name("type")
             stmts.append({
                 "kind": "new",
-                "owner_method": owner,
+                "method": method,
                 "parts": {"type": slice_text(src_b, t).strip()},
                 "range": [n.start_byte, n.end_byte]
             })
@@ -192,7 +367,7 @@ def _collect_stmts(src_b, node, owner, pkg, stmts):
                 recv = slice_text(src_b, obj).strip()
             stmts.append({
                 "kind": "call",
-                "owner_method": owner,
+                "method": method,
                 "parts": {"recv": recv, "name": slice_text(src_b, name), "args": arglist},
                 "range": [n.start_byte, n.end_byte]
             })
@@ -12,39 +12,39 @@ from dependency_graph.llm_integration import (
     LLMIntegration,
     FunctionDescription,
 )
-from dependency_graph.mandate_filter import MandateFilter
+from dependency_graph.mandate_filter import MandateFilter, group_nodes_by_file
+from dependency_graph.parse_cache import ParseCache
+from dependency_graph.description_cache import DescriptionCache
 from dependency_graph.subgraph_extractor import SubgraphExtractor
 from dependency_graph.dot_exporter import to_dot
+from dependency_graph.graph_io import find_graph_file, iter_jsonl, write_jsonl
+from dependency_graph.source_store import SourceStore
+from dependency_graph.symbol_digest import DigestCache, file_digest
 from utils.file_utils import find_files
+from utils.rate_limit import TokenBucket
 
 
 def _extract_function_descriptions(
-    project_path: Path, llm: LLMIntegration
+    project_path: Path, llm: LLMIntegration, parse_cache: ParseCache | None = None
 ) -> List[FunctionDescription]:
-    descriptions: List[FunctionDescription] = []
-
     java_files = find_files(project_path, (".java",))
     if not java_files:
         raise FileNotFoundError(f"No Java files found under {project_path}")
 
-    for java_file in java_files:
-        parsed = parse_file(java_file)
-        package = parsed["symbols"]["package"]
-        src_bytes = Path(java_file).read_bytes()
-
-        for type_info in parsed["symbols"]["types"]:
-            start, end = type_info["range"]
-            class_code = src_bytes[start:end].decode("utf-8")
-            class_name = type_info["name"]
-
-            class_descriptions = llm.analyze_function_descriptions(
-                java_code=class_code,
-                class_name=class_name,
-                package=package,
-            )
-
-            descriptions.extend(class_descriptions)
-
+    def jobs():
+        # max_open=1: each file's buffer is only needed until the next file is parsed
+        with SourceStore(max_open=1) as sources:
+            for java_file in java_files:
+                parsed = parse_file(java_file, parse_cache, sources)
+                package = parsed["symbols"]["package"]
+                for type_info in parsed["symbols"]["types"]:
+                    start, end = type_info["range"]
+                    yield sources.slice(parsed["path"], start, end), type_info["name"], package
+
+    # classes are sent to the LLM concurrently while later files are still parsing
+    descriptions: List[FunctionDescription] = []
+    for class_descriptions in llm.analyze_function_descriptions_batch(jobs()):
+        descriptions.extend(class_descriptions)
     return descriptions
 
 
@@ -74,10 +74,18 @@ def generate_knowledge_graph(
     model: str,
     api_key: str | None,
     title: str,
+    parse_cache: ParseCache | None = None,
+    max_in_flight: int = 8,
+    requests_per_second: float | None = None,
+    description_cache: DescriptionCache | None = None,
 ) -> None:
-    llm = LLMIntegration(api_key=api_key, model=model)
+    llm = LLMIntegration(api_key=api_key, model=model, max_in_flight=max_in_flight,
+                         requests_per_second=requests_per_second,
+                         description_cache=description_cache)
 
-    function_descriptions = _extract_function_descriptions(project_path, llm)
+    function_descriptions = _extract_function_descriptions(project_path, llm, parse_cache)
+    if description_cache is not None:
+        print(f"Description cache: {description_cache.stats()}")
 
     if not function_descriptions:
         raise RuntimeError(
@@ -112,6 +120,14 @@ def generate_mandate_focused_knowledge_graph(
     model: str,
     api_key: str,
     title: str,
+    max_in_flight: int = 8,
+    requests_per_second: float | None = None,
+    description_cache: DescriptionCache | None = None,
+    mandate_cache: Path | None = None,
+    keyword_prefilter: bool = False,
+    batch_tokens: int = 0,
+    parse_cache: ParseCache | None = None,
+    raw_source: bool = False,
 ) -> None:
     """
     Generate knowledge graph focused on mandate-relevant code.
@@ -127,31 +143,51 @@ def generate_mandate_focused_knowledge_graph(
 
     # Step 1: Load dependency graph
     print("\n📂 Loading dependency graph...")
-    nodes_path = dependency_graph_dir / "nodes.jsonl"
-    edges_path = dependency_graph_dir / "edges.jsonl"
+    nodes_path = find_graph_file(dependency_graph_dir, "nodes")
+    edges_path = find_graph_file(dependency_graph_dir, "edges")
 
-    if not nodes_path.exists() or not edges_path.exists():
+    if not nodes_path or not edges_path:
         raise FileNotFoundError(
             f"Dependency graph files not found in {dependency_graph_dir}. "
             "Please run test_parser.py first to generate nodes.jsonl and edges.jsonl"
         )
 
-    nodes = [json.loads(line) for line in nodes_path.read_text().splitlines() if line.strip()]
-    edges = [json.loads(line) for line in edges_path.read_text().splitlines() if line.strip()]
-    print(f"   Loaded {len(nodes)} nodes, {len(edges)} edges")
-
-    # Step 2: Load source files for mandate filtering
+    # one streaming pass each: file -> node ids for filtering, and the
+    # adjacency for traversal; node dicts are re-read for the subgraph only
+    nodes_by_file = {}
+    node_ids = []
+    for node in iter_jsonl(nodes_path):
+        node_ids.append(node["id"])
+        group_nodes_by_file((node,), nodes_by_file)
+    extractor = SubgraphExtractor(node_ids, iter_jsonl(edges_path))
+    print(f"   Loaded {len(node_ids)} nodes, {len(extractor.graph)} edges")
+
+    # relevance checks and descriptions share one --requests-per-second budget
+    bucket = TokenBucket(requests_per_second) if requests_per_second else None
+    mandate_filter = MandateFilter(api_key=api_key, model=model, max_workers=max_in_flight,
+                                   cache_path=mandate_cache, prefilter=keyword_prefilter,
+                                   batch_tokens=batch_tokens, symbol_summaries=not raw_source,
+                                   rate_limiter=bucket)
+
+    # Step 2: Summarize source files for mandate filtering (symbol digests
+    # unless raw_source). Digests are cached next to the parse results, or
+    # in whichever other cache is configured
     print("\n📄 Loading source files...")
     source_files = {}
     java_files = find_files(project_path, (".java",))
+    stores = [c.store for c in (parse_cache, mandate_filter, description_cache)
+              if c is not None and c.store is not None]
+    digest_cache = DigestCache(stores[0]) if stores else None
     for java_file in java_files:
         rel_path = str(Path(java_file).relative_to(project_path))
-        source_files[rel_path] = Path(java_file).read_text(encoding="utf-8")
+        if raw_source:
+            source_files[rel_path] = Path(java_file).read_text(encoding="utf-8")
+        else:
+            source_files[rel_path] = file_digest(java_file, parse_cache, digest_cache)
 
     # Step 3: Filter nodes by mandate relevance
-    mandate_filter = MandateFilter(api_key=api_key, model=model)
-    relevant_node_ids = mandate_filter.filter_nodes_by_mandate(
-        nodes, source_files, mandate
+    relevant_node_ids = mandate_filter.filter_files_by_mandate(
+        nodes_by_file, source_files, mandate
     )
 
     if not relevant_node_ids:
@@ -159,23 +195,29 @@ def generate_mandate_focused_knowledge_graph(
 
     # Step 4: Extract focused subgraph
     print("\n🔗 Extracting focused subgraph...")
-    extractor = SubgraphExtractor(nodes, edges)
-    subgraph_nodes, subgraph_edges = extractor.extract_focused_subgraph(
+    subgraph_ids, subgraph_edges = extractor.select(
         seed_node_ids=relevant_node_ids,
         include_dependencies=True,
         include_dependents=True,
         max_depth=2
     )
+    wanted = set(subgraph_ids)
+    subgraph_nodes = {}
+    file_hashes = {}  # from the module nodes, which the subgraph may not include
+    for node in iter_jsonl(nodes_path):
+        metadata = node.get("metadata", {})
+        if metadata.get("file_sha256"):
+            file_hashes[metadata["file_path"]] = metadata["file_sha256"]
+        if node["id"] in wanted:
+            # first position, last copy: same as a dict keyed on the full node list
+            subgraph_nodes[node["id"]] = node
+    subgraph_nodes = list(subgraph_nodes.values())
 
     # Step 5: Export subgraph for reference
     subgraph_dir = output_dir / "subgraph"
     subgraph_dir.mkdir(parents=True, exist_ok=True)
-    (subgraph_dir / "nodes.jsonl").write_text(
-        "\n".join(json.dumps(n) for n in subgraph_nodes)
-    )
-    (subgraph_dir / "edges.jsonl").write_text(
-        "\n".join(json.dumps(e) for e in subgraph_edges)
-    )
+    write_jsonl(subgraph_dir / "nodes.jsonl", subgraph_nodes)
+    write_jsonl(subgraph_dir / "edges.jsonl", subgraph_edges)
 
     # Step 5b: Generate subgraph visualizations (DOT and PNG)
     print("📊 Generating subgraph visualizations...")
@@ -188,31 +230,32 @@ def generate_mandate_focused_knowledge_graph(
 
     # Step 6: Generate LLM descriptions for subgraph methods
     print("\n🤖 Generating LLM descriptions for focused subgraph...")
-    llm = LLMIntegration(api_key=api_key, model=model)
+    llm = LLMIntegration(api_key=api_key, model=model, max_in_flight=max_in_flight,
+                         description_cache=description_cache, rate_limiter=bucket)
 
     function_descriptions = []
     method_nodes = [n for n in subgraph_nodes if n["id"].startswith("method:")]
-
-    for method_node in method_nodes:
-        metadata = method_node.get("metadata", {})
-        source_code = metadata.get("source_code", "")
-
-        if not source_code:
-            continue
-
-        # Extract class and package info
-        owner_fqn = metadata.get("owner_fqn", "")
-        parts = owner_fqn.rsplit(".", 1)
-        package = parts[0] if len(parts) > 1 else ""
-        class_name = parts[1] if len(parts) > 1 else owner_fqn
-
-        # Generate description for this method
-        descriptions = llm.analyze_function_descriptions(
-            java_code=source_code,
-            class_name=class_name,
-            package=package,
-        )
+    jobs = []
+    with SourceStore(root=project_path, file_hashes=file_hashes) as sources:
+        for method_node in method_nodes:
+            metadata = method_node.get("metadata", {})
+            source_code = sources.source_for(method_node)
+
+            if not source_code:
+                continue
+
+            # Extract class and package info
+            owner_fqn = metadata.get("owner_fqn", "")
+            parts = owner_fqn.rsplit(".", 1)
+            package = parts[0] if len(parts) > 1 else ""
+            class_name = parts[1] if len(parts) > 1 else owner_fqn
+            jobs.append((source_code, class_name, package))
+
+    # Generate descriptions for all methods concurrently
+    for descriptions in llm.analyze_function_descriptions_batch(jobs):
         function_descriptions.extend(descriptions)
+    if description_cache is not None:
+        print(f"   Description cache: {description_cache.stats()}")
 
     if not function_descriptions:
         raise RuntimeError("No function descriptions were generated from subgraph.")
@@ -300,6 +343,59 @@ def main() -> None:
         default=Path(__file__).resolve().parents[2] / "tmp" / "graph_out",
         help="Directory containing edges.jsonl and nodes.jsonl from dependency analyzer"
     )
+    parser.add_argument(
+        "--parse-cache",
+        type=Path,
+        default=None,
+        help="SQLite file caching parse results by content hash (shared with java-dep-analyze)"
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=8,
+        help="Maximum number of concurrent LLM requests (default: 8)"
+    )
+    parser.add_argument(
+        "--requests-per-second",
+        type=float,
+        default=None,
+        help="Optional client-side cap on LLM request rate"
+    )
+    parser.add_argument(
+        "--description-cache",
+        type=Path,
+        default=None,
+        help="SQLite file caching LLM function descriptions by class source and model"
+    )
+    parser.add_argument(
+        "--description-cache-ttl",
+        type=float,
+        default=None,
+        help="Re-request cached descriptions older than this many seconds"
+    )
+    parser.add_argument(
+        "--mandate-cache",
+        type=Path,
+        default=None,
+        help="SQLite file persisting per-file mandate relevance decisions "
+             "(and symbol digests, unless --parse-cache is given)"
+    )
+    parser.add_argument(
+        "--keyword-prefilter",
+        action="store_true",
+        help="Skip the LLM for files sharing no keywords with the mandate (BM25)"
+    )
+    parser.add_argument(
+        "--batch-tokens",
+        type=int,
+        default=0,
+        help="Ask about several files per relevance prompt, up to about this many tokens (0: one file per prompt)"
+    )
+    parser.add_argument(
+        "--raw-source",
+        action="store_true",
+        help="Send raw source to relevance checks instead of compact symbol summaries"
+    )
 
     args = parser.parse_args()
     if not args.api_key:
@@ -308,6 +404,12 @@ def main() -> None:
             "TOGETHER_API_KEY environment variable."
         )
 
+    parse_cache = ParseCache(args.parse_cache) if args.parse_cache else None
+    description_cache = (
+        DescriptionCache(args.description_cache, ttl=args.description_cache_ttl)
+        if args.description_cache else None
+    )
+
     if args.mandate:
         # Use mandate-focused workflow
         generate_mandate_focused_knowledge_graph(
@@ -318,6 +420,14 @@ def main() -> None:
             model=args.model,
             api_key=args.api_key,
             title=args.title,
+            max_in_flight=args.max_in_flight,
+            requests_per_second=args.requests_per_second,
+            description_cache=description_cache,
+            mandate_cache=args.mandate_cache,
+            keyword_prefilter=args.keyword_prefilter,
+            batch_tokens=args.batch_tokens,
+            parse_cache=parse_cache,
+            raw_source=args.raw_source,
         )
     else:
         # Use original full-repo workflow
@@ -327,6 +437,10 @@ def main() -> None:
             model=args.model,
             api_key=args.api_key,
             title=args.title,
+            max_in_flight=args.max_in_flight,
+            requests_per_second=args.requests_per_second,
+            description_cache=description_cache,
+            parse_cache=parse_cache,
         )
 
 
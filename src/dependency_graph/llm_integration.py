@@ -9,14 +9,24 @@ This module provides integration with Large Language Models for:
 
 import os
 import json
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Any, Sequence, Tuple, TypeVar
+from dataclasses import asdict, dataclass
 from together import Together
 from dotenv import load_dotenv
 
+from utils.rate_limit import TokenBucket, retry_call
+
 # Load environment variables
 load_dotenv()
 
+T = TypeVar("T")
+
+# Bump whenever the function-description prompt or its parsing changes so
+# cached descriptions are requested again.
+DESCRIPTION_PROMPT_VERSION = 1
+
 
 @dataclass
 class FunctionDescription:
@@ -50,13 +60,72 @@ class MigrationPlan:
 class LLMIntegration:
     """Integration with Large Language Models for code analysis and generation"""
 
-    def __init__(self, api_key: Optional[str] = None, model: str = "meta-llama/Meta-Llama-3.1-70B-Instruct-Turbo"):
+    def __init__(self,
+                 api_key: Optional[str] = None,
+                 model: str = "meta-llama/Meta-Llama-3.1-70B-Instruct-Turbo",
+                 max_in_flight: int = 8,
+                 requests_per_second: Optional[float] = None,
+                 max_retries: int = 5,
+                 description_cache=None,
+                 rate_limiter: Optional[TokenBucket] = None):
+        """
+        Args:
+            api_key: Together.ai API key (defaults to TOGETHER_API_KEY)
+            model: Model identifier used for every request
+            max_in_flight: Upper bound on concurrent requests, shared by all threads
+            requests_per_second: Optional client-side rate limit (token bucket)
+            max_retries: Retries per request on 429/5xx/timeouts, with jittered backoff
+            description_cache: Optional DescriptionCache consulted before describing a class
+            rate_limiter: TokenBucket to wait on instead of one built from
+                requests_per_second, e.g. shared with a MandateFilter
+        """
         self.api_key = api_key or os.getenv("TOGETHER_API_KEY")
         if not self.api_key:
             raise ValueError("Together.ai API key is required. Set TOGETHER_API_KEY environment variable or pass api_key parameter.")
 
         self.client = Together(api_key=self.api_key)
         self.model = model
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        if rate_limiter is None and requests_per_second:
+            rate_limiter = TokenBucket(requests_per_second)
+        self._bucket = rate_limiter
+        self.description_cache = description_cache
+
+    def _chat(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        """One chat completion, throttled and retried; returns the message content."""
+        def call():
+            if self._bucket is not None:
+                self._bucket.acquire()
+            with self._in_flight:
+                return self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                )
+
+        response = retry_call(call, max_retries=self.max_retries)
+        return response.choices[0].message.content
+
+    def map_concurrent(self, fn: Callable[..., T], jobs: Iterable[Sequence]) -> List[T]:
+        """
+        Run fn(*job) for every job on up to max_in_flight threads.
+
+        jobs may be a lazy iterable; work starts as jobs are produced. Results
+        come back in job order.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            return list(pool.map(lambda job: fn(*job), jobs))
+
+    def analyze_function_descriptions_batch(
+            self, jobs: Iterable[Tuple[str, str, str]]) -> List[List[FunctionDescription]]:
+        """
+        analyze_function_descriptions() over many (java_code, class_name, package)
+        jobs concurrently; one result list per job, in job order.
+        """
+        return self.map_concurrent(self.analyze_function_descriptions, jobs)
     
     def analyze_function_descriptions(self, 
                                     java_code: str, 
@@ -73,6 +142,15 @@ class LLMIntegration:
         Returns:
             List of FunctionDescription objects
         """
+        cache_key = None
+        if self.description_cache is not None:
+            cache_key = self.description_cache.key(
+                self.model, DESCRIPTION_PROMPT_VERSION, java_code, class_name, package
+            )
+            cached = self.description_cache.get(cache_key)
+            if cached is not None:
+                return [FunctionDescription(**d) for d in cached]
+
         prompt = f"""
         Analyze the following Java code and provide detailed descriptions for each method/function.
         Focus on understanding what each method does, its parameters, return values, and dependencies.
@@ -115,17 +193,15 @@ class LLMIntegration:
         """
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
+            content = self._chat(
+                [
                     {"role": "system", "content": "You are an expert Java code analyzer. Provide detailed, accurate analysis of Java methods and their functionality."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.1,
-                max_tokens=4000
+                max_tokens=4000,
             )
             
-            content = response.choices[0].message.content
             # Extract JSON from the response
             json_start = content.find('[')
             json_end = content.rfind(']') + 1
@@ -150,6 +226,8 @@ class LLMIntegration:
                         usage_context=method.get('usage_context', '')
                     ))
                 
+                if cache_key is not None:
+                    self.description_cache.put(cache_key, [asdict(d) for d in descriptions])
                 return descriptions
             else:
                 raise ValueError("Could not extract JSON from LLM response")
@@ -236,17 +314,15 @@ class LLMIntegration:
         """
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
+            content = self._chat(
+                [
                     {"role": "system", "content": "You are an expert Java migration specialist. Create detailed, actionable migration plans that are safe and comprehensive."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.2,
-                max_tokens=3000
+                max_tokens=3000,
             )
             
-            content = response.choices[0].message.content
             # Extract JSON from the response
             json_start = content.find('{')
             json_end = content.rfind('}') + 1
@@ -330,17 +406,16 @@ class LLMIntegration:
         """
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
+            content = self._chat(
+                [
                     {"role": "system", "content": "You are an expert Java developer. Generate clean, compilable, and well-structured Java code that follows best practices."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.1,
-                max_tokens=4000
+                max_tokens=4000,
             )
             
-            return response.choices[0].message.content.strip()
+            return content.strip()
             
         except Exception as e:
             print(f"Error generating migrated code: {e}")
@@ -395,17 +470,16 @@ class LLMIntegration:
         """
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
+            content = self._chat(
+                [
                     {"role": "system", "content": "You are an expert at summarizing software systems as Graphviz knowledge graphs."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.1,
-                max_tokens=4000
+                max_tokens=4000,
             )
 
-            content = response.choices[0].message.content.strip()
+            content = content.strip()
 
             # Try to extract from code fence
             if "```" in content:
@@ -488,17 +562,15 @@ class LLMIntegration:
         """
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
+            content = self._chat(
+                [
                     {"role": "system", "content": "You are an expert Java code reviewer. Provide thorough validation of code migrations with specific feedback."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.1,
-                max_tokens=2000
+                max_tokens=2000,
             )
             
-            content = response.choices[0].message.content
             # Extract JSON from the response
             json_start = content.find('{')
             json_end = content.rfind('}') + 1
@@ -1,21 +1,183 @@
 """
 Mandate-based file filtering using LLM.
 
-Determines which files are relevant to a given mandate/task.
+Determines which files are relevant to a given mandate/task. Files are
+classified concurrently, decisions can persist across runs in a BlobStore
+keyed on (content hash, normalized mandate, model), and an optional BM25
+keyword pre-filter skips the LLM for files that share no terms with the
+mandate.
 """
 
+import hashlib
 import json
+import math
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Set
+from typing import List, Dict, Iterable, Optional, Set, Tuple
 from together import Together
 
+from utils.blob_store import BlobStore
+from utils.file_utils import PathIndex
+from utils.rate_limit import TokenBucket, retry_call
+
+_WORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+_STOPWORDS = frozenset(
+    "the and for with from into that this all any are was were has have not "
+    "get set new add use using code java class method file files "
+    "public private protected static final void return import package".split()
+)
+
+
+def _stem(w: str) -> str:
+    # light suffix stripping so "payments"/"processing" meet "payment"/"process"
+    if w.endswith("ing") and len(w) >= 7:
+        w = w[:-3]
+    elif w.endswith("ed") and len(w) >= 6:
+        w = w[:-2]
+    elif w.endswith(("sses", "xes", "ches", "shes")):
+        w = w[:-2]
+    elif w.endswith("s") and not w.endswith("ss") and len(w) >= 5:
+        w = w[:-1]
+    if w.endswith("e") and len(w) >= 5:
+        w = w[:-1]
+    return w
+
+
+def identifier_terms(text: str) -> List[str]:
+    """Lowercased, stemmed word pieces of text, splitting camelCase and snake_case identifiers."""
+    terms = []
+    for w in _WORD.findall(text):
+        w = w.lower()
+        if len(w) < 3 or w in _STOPWORDS:
+            continue
+        terms.append(_stem(w))
+    return terms
+
+
+def bm25_scores(query: str, docs: Dict[str, str], k1: float = 1.2, b: float = 0.75) -> Dict[str, float]:
+    """Okapi BM25 score of every doc against the query's identifier terms."""
+    query_terms = set(identifier_terms(query))
+    tfs = {key: Counter(identifier_terms(text)) for key, text in docs.items()}
+    if not tfs or not query_terms:
+        return {key: 0.0 for key in docs}
+    avg_len = sum(sum(tf.values()) for tf in tfs.values()) / len(tfs) or 1.0
+    df = Counter(t for tf in tfs.values() for t in query_terms if t in tf)
+    n = len(tfs)
+    scores = {}
+    for key, tf in tfs.items():
+        length = sum(tf.values())
+        score = 0.0
+        for t in query_terms:
+            f = tf.get(t)
+            if f:
+                idf = math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5))
+                score += idf * f * (k1 + 1) / (f + k1 * (1 - b + b * length / avg_len))
+        scores[key] = score
+    return scores
+
+
+# Characters of each file shown to the model
+_EXCERPT_CHARS = 5000
+# "3: YES - reason" lines in a batched answer
+_BATCH_LINE = re.compile(r"^\W*(\d+)\W+(YES|NO)\b.*$", re.I | re.M)
+
+
+def normalize_mandate(mandate: str) -> str:
+    return " ".join(mandate.lower().split())
+
+
+def group_nodes_by_file(nodes: Iterable[Dict], groups: Optional[Dict[str, List[str]]] = None
+                        ) -> Dict[str, List[str]]:
+    """
+    Map each node's (posix-normalized) file path to the ids of its nodes.
+
+    Pass `groups` to add to an existing mapping one node at a time, e.g.
+    while streaming nodes.jsonl for other purposes too.
+    """
+    groups = {} if groups is None else groups
+    for node in nodes:
+        file_path = node.get("metadata", {}).get("file_path", "")
+        if file_path:
+            groups.setdefault(Path(file_path).as_posix(), []).append(node["id"])
+    return groups
+
 
 class MandateFilter:
-    def __init__(self, api_key: str, model: str = "meta-llama/Meta-Llama-3.1-70B-Instruct-Turbo"):
-        """Initialize mandate filter with LLM client"""
+    def __init__(self, api_key: str, model: str = "meta-llama/Meta-Llama-3.1-70B-Instruct-Turbo",
+                 max_workers: int = 8, cache_path: Optional[str | Path] = None,
+                 prefilter: bool = False, min_score: float = 0.0,
+                 batch_tokens: int = 0, max_batch_files: int = 20,
+                 symbol_summaries: bool = False, rate_limiter: Optional[TokenBucket] = None):
+        """
+        Initialize mandate filter with LLM client
+
+        Args:
+            api_key: Together.ai API key
+            model: Model used for relevance questions
+            max_workers: Files classified concurrently
+            cache_path: Optional SQLite file persisting decisions across runs
+            prefilter: Skip the LLM for files whose BM25 keyword score is <= min_score
+            min_score: Pre-filter threshold (0 drops only files sharing no terms)
+            batch_tokens: If > 0, pack several files into one prompt up to roughly
+                this many tokens; files of a batch that fails are asked singly
+            max_batch_files: Upper bound on files per batched prompt
+            symbol_summaries: File contents are symbol digests (see symbol_digest)
+                rather than raw source; only changes how prompts label them
+            rate_limiter: Optional TokenBucket every request (retries included)
+                waits on; share one to cap the rate across clients
+        """
         self.client = Together(api_key=api_key)
         self.model = model
+        self.max_workers = max_workers
+        self.prefilter = prefilter
+        self.min_score = min_score
+        self.batch_tokens = batch_tokens
+        self.max_batch_files = max_batch_files
+        self._bucket = rate_limiter
+        if symbol_summaries:
+            self._content_label, self._fence = "Symbol summary (package, types, members, calls)", ""
+        else:
+            self._content_label, self._fence = "Source code", "java"
         self.cache = {}  # Cache file relevance decisions
+        self.store = BlobStore(cache_path) if cache_path else None
+
+    def _store_key(self, file_content: str, mandate: str) -> str:
+        content_sha = hashlib.sha256(file_content.encode("utf-8")).hexdigest()
+        payload = json.dumps([content_sha, normalize_mandate(mandate), self.model])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _lookup(self, file_path: str, file_content: str, mandate: str) -> Optional[bool]:
+        """Earlier decision for this file from the in-memory or persistent cache."""
+        cache_key = f"{file_path}:{mandate}"
+        if cache_key in self.cache:
+            return self.cache[cache_key]
+        if self.store is not None:
+            stored = self.store.get_json(self._store_key(file_content, mandate))
+            if stored is not None:
+                self.cache[cache_key] = stored["relevant"]
+                return stored["relevant"]
+        return None
+
+    def _remember(self, file_path: str, file_content: str, mandate: str,
+                  is_relevant: bool, answer: str) -> None:
+        self.cache[f"{file_path}:{mandate}"] = is_relevant
+        if self.store is not None:
+            self.store.put_json(self._store_key(file_content, mandate),
+                                {"relevant": is_relevant, "answer": answer})
+        print(f"  {file_path}: {'✓ RELEVANT' if is_relevant else '✗ Not relevant'} - {answer}")
+
+    def _ask(self, prompt: str, max_tokens: int) -> str:
+        def call():
+            if self._bucket is not None:
+                self._bucket.acquire()
+            return self.client.chat.completions.create(
+                model=self.model,
+                max_tokens=max_tokens,
+                messages=[{"role": "user", "content": prompt}]
+            )
+        return retry_call(call).choices[0].message.content.strip()
 
     def is_file_relevant(self, file_path: str, file_content: str, mandate: str) -> bool:
         """
@@ -29,9 +191,9 @@ class MandateFilter:
         Returns:
             True if file is relevant to the mandate, False otherwise
         """
-        cache_key = f"{file_path}:{mandate}"
-        if cache_key in self.cache:
-            return self.cache[cache_key]
+        known = self._lookup(file_path, file_content, mandate)
+        if known is not None:
+            return known
 
         prompt = f"""You are analyzing a Java codebase for relevance to a specific mandate/task.
 
@@ -39,10 +201,10 @@ Mandate: {mandate}
 
 File: {file_path}
 
-Source code:
+{self._content_label}:
 
-```java
-{file_content[:5000]}  # Limit to first 5000 chars to save tokens
+```{self._fence}
+{file_content[:_EXCERPT_CHARS]}
 ```
 
 Question: Is this file relevant to the mandate?
@@ -58,23 +220,94 @@ or
 NO - [reason]
 """
 
-        response = self.client.chat.completions.create(
-            model=self.model,
-            max_tokens=100,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        answer = response.choices[0].message.content.strip()
+        answer = self._ask(prompt, max_tokens=100)
 
         is_relevant = answer.upper().startswith("YES")
 
-        self.cache[cache_key] = is_relevant
-        print(f"  {file_path}: {'✓ RELEVANT' if is_relevant else '✗ Not relevant'} - {answer}")
+        self._remember(file_path, file_content, mandate, is_relevant, answer)
 
         return is_relevant
 
+    def classify_batch(self, files: List[Tuple[str, str]], mandate: str) -> List[bool]:
+        """
+        Ask about several (file_path, file_content) pairs in one prompt.
+
+        Raises ValueError if the answer doesn't give a YES/NO for every file.
+        """
+        blocks = "\n\n".join(
+            f"### FILE {i}: {file_path}\n```{self._fence}\n{file_content[:_EXCERPT_CHARS]}\n```"
+            for i, (file_path, file_content) in enumerate(files, 1)
+        )
+        prompt = f"""You are analyzing a Java codebase for relevance to a specific mandate/task.
+
+Mandate: {mandate}
+
+Below are {len(files)} files, each introduced by "### FILE <number>: <path>".
+
+{blocks}
+
+Question: Is each file relevant to the mandate?
+
+Answer with exactly one line per file, in file order, and nothing else.
+
+Format:
+
+<number>: YES - [reason]
+
+or
+
+<number>: NO - [reason]
+"""
+        answer = self._ask(prompt, max_tokens=40 * len(files) + 20)
+
+        lines = {}
+        for m in _BATCH_LINE.finditer(answer):
+            lines.setdefault(int(m.group(1)), (m.group(2).upper() == "YES", m.group(0).strip()))
+        missing = [i for i in range(1, len(files) + 1) if i not in lines]
+        if missing:
+            raise ValueError(f"batched answer has no verdict for file(s) {missing}")
+
+        verdicts = []
+        for i, (file_path, file_content) in enumerate(files, 1):
+            is_relevant, line = lines[i]
+            self._remember(file_path, file_content, mandate, is_relevant, line)
+            verdicts.append(is_relevant)
+        return verdicts
+
+    def _batches(self, files: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
+        """Greedy packing of files into prompts of about batch_tokens (4 chars/token)."""
+        batches, current, used = [], [], 0
+        for item in files:
+            cost = (len(item[0]) + min(len(item[1]), _EXCERPT_CHARS)) // 4 + 10
+            if current and (used + cost > self.batch_tokens or len(current) >= self.max_batch_files):
+                batches.append(current)
+                current, used = [], 0
+            current.append(item)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    def _classify(self, files: List[Tuple[str, str]], mandate: str) -> List[bool]:
+        if len(files) > 1:
+            try:
+                return self.classify_batch(files, mandate)
+            except Exception as e:
+                print(f"  Batch of {len(files)} files failed ({e}); asking one file at a time")
+        return [self._classify_one(f, c, mandate) for f, c in files]
+
+    def _classify_one(self, file_path: str, file_content: str, mandate: str) -> bool:
+        # one file that still fails after retries must not abort the whole run;
+        # keep it (not cached), since dropping a relevant file loses its nodes
+        try:
+            return self.is_file_relevant(file_path, file_content, mandate)
+        except Exception as e:
+            print(f"  {file_path}: relevance check failed ({e}); keeping it")
+            return True
+
     def filter_nodes_by_mandate(
         self,
-        nodes: List[Dict],
+        nodes: Iterable[Dict],
         source_files: Dict[str, str],  # file_path -> content
         mandate: str
     ) -> Set[str]:
@@ -82,47 +315,57 @@ NO - [reason]
         Filter dependency graph nodes to only those in mandate-relevant files.
 
         Args:
-            nodes: List of dependency graph nodes
+            nodes: Dependency graph nodes
             source_files: Mapping of file paths to their content
             mandate: User's mandate/task description
 
         Returns:
             Set of node IDs that belong to relevant files
         """
+        return self.filter_files_by_mandate(group_nodes_by_file(nodes), source_files, mandate)
+
+    def filter_files_by_mandate(
+        self,
+        nodes_by_file: Dict[str, List[str]],  # file_path -> node ids
+        source_files: Dict[str, str],  # file_path -> content
+        mandate: str
+    ) -> Set[str]:
+        """filter_nodes_by_mandate for nodes already grouped by group_nodes_by_file()."""
         print(f"\n🔍 Filtering files for mandate: '{mandate}'")
 
-        # Group nodes by file
-        nodes_by_file = {}
-        for node in nodes:
-            metadata = node.get("metadata", {})
-            file_path = metadata.get("file_path", "")
-            if file_path:
-                # Normalize path for comparison
-                normalized_path = str(Path(file_path).as_posix())
-                if normalized_path not in nodes_by_file:
-                    nodes_by_file[normalized_path] = []
-                nodes_by_file[normalized_path].append(node["id"])
-
-        # Check each file for relevance
-        relevant_node_ids = set()
-        for file_path, node_ids in nodes_by_file.items():
-            # Try to find matching file in source_files
-            matching_key = None
-            for key in source_files.keys():
-                if str(Path(key).as_posix()) == file_path or file_path.endswith(key) or key.endswith(file_path):
-                    matching_key = key
-                    break
-            
-            if matching_key and matching_key in source_files:
-                file_content = source_files[matching_key]
-                if self.is_file_relevant(file_path, file_content, mandate):
-                    relevant_node_ids.update(node_ids)
+        # Pair each file group with its source (graph paths and source_files keys
+        # may be relative to different roots)
+        index = PathIndex(source_files)
+        candidates = {}  # file_path -> content
+        for file_path in nodes_by_file:
+            matching_key = index.lookup(file_path)
+            if matching_key is not None:
+                candidates[file_path] = source_files[matching_key]
+
+        if self.prefilter and candidates:
+            scores = bm25_scores(mandate, candidates)
+            kept = {f: c for f, c in candidates.items() if scores[f] > self.min_score}
+            print(f"  Keyword pre-filter kept {len(kept)}/{len(candidates)} files")
+            candidates = kept
+
+        # Reuse earlier decisions, then ask about the rest concurrently
+        verdicts = {}
+        pending = []
+        for file_path, file_content in candidates.items():
+            known = self._lookup(file_path, file_content, mandate)
+            if known is None:
+                pending.append((file_path, file_content))
             else:
-                # Try direct lookup
-                if file_path in source_files:
-                    file_content = source_files[file_path]
-                    if self.is_file_relevant(file_path, file_content, mandate):
-                        relevant_node_ids.update(node_ids)
+                verdicts[file_path] = known
+        units = self._batches(pending) if self.batch_tokens > 0 else [[item] for item in pending]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for unit, results in zip(units, pool.map(lambda u: self._classify(u, mandate), units)):
+                verdicts.update((file_path, v) for (file_path, _), v in zip(unit, results))
+
+        relevant_node_ids = set()
+        for file_path, is_relevant in verdicts.items():
+            if is_relevant:
+                relevant_node_ids.update(nodes_by_file[file_path])
 
         print(f"\n✅ Found {len(relevant_node_ids)} relevant nodes across {len([f for f in nodes_by_file.keys() if any(nid in relevant_node_ids for nid in nodes_by_file[f])])} files")
 
@@ -17,6 +17,9 @@ from .jira_parser import JiraParser, MigrationRequirement
 from .llm_integration import LLMIntegration, FunctionDescription, MigrationPlan
 from .dependency_analyzer import Analyzer
 from .analyzer import index_repo
+from .parse_cache import ParseCache
+from .description_cache import DescriptionCache
+from .source_store import SourceStore
 
 
 @dataclass
@@ -41,7 +44,9 @@ class MigrationEngine:
                  openai_api_key: Optional[str] = None,
                  jira_base_url: Optional[str] = None,
                  jira_api_token: Optional[str] = None,
-                 llm_model: str = "gpt-4"):
+                 llm_model: str = "gpt-4",
+                 parse_cache: Optional[ParseCache] = None,
+                 description_cache: Optional[DescriptionCache] = None):
         """
         Initialize the migration engine
         
@@ -50,10 +55,16 @@ class MigrationEngine:
             jira_base_url: JIRA base URL for ticket fetching
             jira_api_token: JIRA API token for authentication
             llm_model: LLM model to use (default: gpt-4)
+            parse_cache: Optional content-addressed cache of parse results
+            description_cache: Optional persistent cache of LLM function descriptions
         """
-        self.llm = LLMIntegration(api_key=openai_api_key, model=llm_model)
+        self.llm = LLMIntegration(api_key=openai_api_key, model=llm_model,
+                                  description_cache=description_cache)
         self.jira_parser = JiraParser(jira_base_url, jira_api_token)
         self.analyzer = Analyzer()
+        self.parse_cache = parse_cache
+        # file bytes read while indexing, reused by the LLM steps; released per run
+        self.sources = SourceStore()
     
     def migrate_from_jira_ticket(self, 
                                 ticket_input: str,
@@ -120,6 +131,8 @@ class MigrationEngine:
                 errors=[str(e)],
                 warnings=[]
             )
+        finally:
+            self.sources.close()
     
     def _parse_ticket(self, ticket_input: str) -> MigrationRequirement:
         """Parse JIRA ticket from input"""
@@ -135,7 +148,8 @@ class MigrationEngine:
         project_path = Path(project_path)
         
         # Index the repository
-        files = index_repo(project_path)
+        self.sources.close()
+        files = index_repo(project_path, cache=self.parse_cache, sources=self.sources)
         
         # Run dependency analysis
         self.analyzer.files = files
@@ -174,19 +188,21 @@ class MigrationEngine:
                         target_files.add(Path(file_data["path"]).name)
         
         # Analyze each target file
+        jobs = []
         for file_data in ast_analysis["files"]:
             file_path = Path(file_data["path"])
             if file_path.name in target_files:
-                java_code = file_path.read_text()
+                java_code = self.sources.text(str(file_path))
                 package = file_data["symbols"]["package"]
                 
                 for class_info in file_data["symbols"]["types"]:
                     class_name = class_info["name"]
                     if not requirements.affected_classes or class_name in requirements.affected_classes:
-                        descriptions = self.llm.analyze_function_descriptions(
-                            java_code, class_name, package
-                        )
-                        function_descriptions.extend(descriptions)
+                        jobs.append((java_code, class_name, package))
+        
+        # Classes are described concurrently, bounded by the LLM client's max_in_flight
+        for descriptions in self.llm.analyze_function_descriptions_batch(jobs):
+            function_descriptions.extend(descriptions)
         
         return function_descriptions
     
@@ -211,7 +227,7 @@ class MigrationEngine:
                     continue
                 
                 # Read original content
-                original_content = file_path.read_text()
+                original_content = self.sources.text(str(file_path))
                 original_files[file_name] = original_content
                 
                 # Generate migrated content
@@ -364,3 +380,5 @@ class MigrationEngine:
                 "function_descriptions": [],
                 "ast_summary": {}
             }
+        finally:
+            self.sources.close()
@@ -0,0 +1,34 @@
+"""
+Content-addressed cache for parse_file() results.
+
+Entries are keyed by (sha256 of the file bytes, parser/grammar version) and
+hold only the symbols dict, so the same cache serves index_repo, the
+knowledge graph generator and the migration engine regardless of where the
+project is checked out.
+"""
+
+from pathlib import Path
+from typing import Dict, Optional
+
+from dependency_graph.java_parser import grammar_version
+from utils.blob_store import BlobStore
+
+
+class ParseCache:
+    def __init__(self, path: str | Path, max_bytes: int = 512 * 1024 * 1024):
+        self.store = BlobStore(path, max_bytes=max_bytes)
+        self._version = None
+
+    def _key(self, sha256: str) -> str:
+        if self._version is None:
+            self._version = grammar_version()
+        return f"{sha256}:{self._version}"
+
+    def get(self, sha256: str) -> Optional[Dict]:
+        return self.store.get_json(self._key(sha256))
+
+    def put(self, sha256: str, symbols: Dict) -> None:
+        self.store.put_json(self._key(sha256), symbols)
+
+    def stats(self) -> dict:
+        return self.store.stats()
@@ -0,0 +1,418 @@
+"""
+Precomputed reachability over the dependency edges of a graph.
+
+The Calls/Uses/Instantiates/Implements edges (src depends on dst) are
+condensed into strongly connected components. Every component keeps two
+Python-int bitsets: the components it reaches (its dependencies) and the
+components that reach it (its dependents). Reachability is then one bit
+test, and transitive impact sets are decoded from a single bitset instead of
+repeating a BFS per query. Each bitset is stored relative to the lowest
+component it holds, so it only spans the range of components actually
+reached, which keeps them small on layered call graphs. A long dependency
+chain is still quadratic, so the closures are only kept while their total
+size stays within max_closure_bits; beyond that, queries search the
+condensed graph instead.
+
+The index is saved in a binary file, reachability.bin, next to edges.jsonl.
+The file is tagged with the size and mtime of the edges file, so it is
+rebuilt only when that file changes. Edges can be added incrementally. An
+edge that closes a cycle, and any edge removal, triggers a rebuild on the
+next query.
+"""
+
+import json
+import os
+import struct
+from array import array
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from dependency_graph.graph_algorithms import iter_bits, strongly_connected_components
+from dependency_graph.graph_io import find_graph_file, iter_jsonl
+
+INDEX_FILE = "reachability.bin"
+LEGACY_INDEX_FILES = ("reachability.json",)
+INDEX_VERSION = 2
+DEPENDENCY_LABELS = frozenset({"Calls", "Uses", "Instantiates", "Implements"})
+# Total closure bits (both directions) kept before falling back to search: 32 MiB
+DEFAULT_MAX_CLOSURE_BITS = 1 << 28
+_MAGIC = b"JDGREACH"
+
+
+def _merge(lo: int, bits: int, other_lo: int, other_bits: int) -> Tuple[int, int]:
+    """Union of two bitsets, each stored as (lowest bit position, bits from there)."""
+    if other_lo < lo:
+        return other_lo, (bits << (lo - other_lo)) | other_bits
+    return lo, bits | (other_bits << (other_lo - lo))
+
+
+class ReachabilityIndex:
+    def __init__(self, edges: Iterable[Dict] = (), labels: Iterable[str] = DEPENDENCY_LABELS,
+                 max_closure_bits: int = DEFAULT_MAX_CLOSURE_BITS):
+        """
+        Args:
+            edges: Graph edges; those labelled with one of labels are indexed
+            labels: Edge labels meaning "src depends on dst"
+            max_closure_bits: Budget for the precomputed closures; above it,
+                queries fall back to searching the condensed graph
+        """
+        self.labels = frozenset(labels)
+        self.max_closure_bits = max_closure_bits
+        self.node_ids: List[str] = []
+        self._node_index: Dict[str, int] = {}
+        self._succ: List[Dict[int, int]] = []   # src -> {dst: parallel edge count}
+        self._pred: List[Set[int]] = []
+        self.fingerprint = None
+        for e in edges:
+            if e["label"] in self.labels:
+                self._link(self._intern(e["src"]), self._intern(e["dst"]))
+        self._build()
+
+    # ---- construction ----
+    def _intern(self, node_id: str) -> int:
+        idx = self._node_index.get(node_id)
+        if idx is None:
+            idx = self._node_index[node_id] = len(self.node_ids)
+            self.node_ids.append(node_id)
+            self._succ.append({})
+            self._pred.append(set())
+        return idx
+
+    def _link(self, s: int, d: int, count: int = 1) -> bool:
+        """Count an s -> d edge; True if it's the first one between them."""
+        seen = self._succ[s].get(d, 0)
+        self._succ[s][d] = seen + count
+        self._pred[d].add(s)
+        return not seen
+
+    def _condense(self, comp, count: int) -> None:
+        self.comp = comp
+        self.members: List[List[int]] = [[] for _ in range(count)]
+        for v in range(len(comp)):
+            self.members[comp[v]].append(v)
+        self._comp_succ: List[Set[int]] = [set() for _ in range(count)]
+        self._comp_pred: List[Set[int]] = [set() for _ in range(count)]
+        for v in range(len(comp)):
+            cv = comp[v]
+            for w in self._succ[v]:
+                if comp[w] != cv:
+                    self._comp_succ[cv].add(comp[w])
+                    self._comp_pred[comp[w]].add(cv)
+        self._dirty = False
+
+    def _build(self) -> None:
+        self._condense(*strongly_connected_components(len(self.node_ids), self._succ.__getitem__))
+        self._build_closures()
+
+    def _build_closures(self) -> None:
+        """
+        down/up bitsets per component, as (self.*_lo[c], self.*[c]) pairs;
+        left as None if they would exceed max_closure_bits.
+        """
+        self.down = self.up = self.down_lo = self.up_lo = None
+        count, budget = len(self.members), self.max_closure_bits
+        # Tarjan numbers components so edges go from higher to lower ids:
+        # descendants are final in ascending order, ancestors in descending
+        down, down_lo, total = [1] * count, array("l", range(count)), count
+        for c in range(count):
+            lo, bits = c, 1
+            for d in self._comp_succ[c]:
+                lo, bits = _merge(lo, bits, down_lo[d], down[d])
+            down_lo[c], down[c] = lo, bits
+            total += bits.bit_length() - 1
+            if total > budget:
+                return
+        up, up_lo = [1] * count, array("l", range(count))
+        total += count
+        for c in range(count - 1, -1, -1):
+            for d in self._comp_succ[c]:
+                before = up[d].bit_length()
+                up_lo[d], up[d] = _merge(up_lo[d], up[d], up_lo[c], up[c])
+                total += up[d].bit_length() - before
+            if total > budget:
+                return
+        self.down, self.down_lo, self.up, self.up_lo = down, down_lo, up, up_lo
+        self._closure_bits = total
+
+    def _ensure(self) -> None:
+        if self._dirty:
+            self._build()
+
+    # ---- updates ----
+    def add_edge(self, src: str, label: str, dst: str) -> None:
+        """Record a new edge, updating closures in place unless it closes a cycle."""
+        if label not in self.labels:
+            return
+        self._ensure()
+        s, d = self._intern(src), self._intern(dst)
+        for v in (s, d):
+            if v >= len(self.comp):  # new node: a fresh singleton component
+                c = len(self.members)
+                self.comp.append(c)
+                self.members.append([v])
+                self._comp_succ.append(set())
+                self._comp_pred.append(set())
+                if self.down is not None:
+                    self.down.append(1)
+                    self.down_lo.append(c)
+                    self.up.append(1)
+                    self.up_lo.append(c)
+                    self._closure_bits += 2
+        if not self._link(s, d):
+            return
+        cs, cd = self.comp[s], self.comp[d]
+        if cs == cd:
+            return
+        if self._comp_reaches(cd, cs):
+            # dst already reaches src: components merge, recompute from scratch
+            self._dirty = True
+            return
+        self._comp_succ[cs].add(cd)
+        self._comp_pred[cd].add(cs)
+        if self.down is None:
+            return
+        gained_down = (self.down_lo[cd], self.down[cd])
+        gained_up = (self.up_lo[cs], self.up[cs])
+        total = self._closure_bits
+        for a in self._closure(cs, self.up, self.up_lo):
+            before = self.down[a].bit_length()
+            self.down_lo[a], self.down[a] = _merge(self.down_lo[a], self.down[a], *gained_down)
+            total += self.down[a].bit_length() - before
+        for b in self._closure(cd, self.down, self.down_lo):
+            before = self.up[b].bit_length()
+            self.up_lo[b], self.up[b] = _merge(self.up_lo[b], self.up[b], *gained_up)
+            total += self.up[b].bit_length() - before
+        self._closure_bits = total
+        if total > self.max_closure_bits:
+            self.down = self.up = self.down_lo = self.up_lo = None
+
+    def remove_edge(self, src: str, label: str, dst: str) -> None:
+        s, d = self._node_index.get(src), self._node_index.get(dst)
+        if label not in self.labels or s is None or d is None or d not in self._succ[s]:
+            return
+        self._succ[s][d] -= 1
+        if not self._succ[s][d]:  # last edge between them: closures may shrink
+            del self._succ[s][d]
+            self._pred[d].discard(s)
+            self._dirty = True
+
+    # ---- queries ----
+    @property
+    def has_closures(self) -> bool:
+        """False when the closures exceeded max_closure_bits and queries search instead."""
+        self._ensure()
+        return self.down is not None
+
+    @staticmethod
+    def _closure(c: int, bits: List[int], lows) -> Iterable[int]:
+        lo = lows[c]
+        return (lo + i for i in iter_bits(bits[c]))
+
+    def _comp_reaches(self, a: int, b: int) -> bool:
+        if a == b:
+            return True
+        if self.down is not None:
+            lo = self.down_lo[a]
+            return b >= lo and bool((self.down[a] >> (b - lo)) & 1)
+        seen, stack = {a}, [a]
+        while stack:
+            for w in self._comp_succ[stack.pop()]:
+                if w == b:
+                    return True
+                if w not in seen:
+                    seen.add(w)
+                    stack.append(w)
+        return False
+
+    def _components(self, comps: Iterable[int], direction: str) -> Iterable[int]:
+        """Components reachable from comps: downwards ("dependencies") or up ("dependents")."""
+        if self.down is not None:
+            bits, lows = (self.up, self.up_lo) if direction == "dependents" else (self.down, self.down_lo)
+            lo, acc = None, 0
+            for c in comps:
+                lo, acc = (lows[c], bits[c]) if lo is None else _merge(lo, acc, lows[c], bits[c])
+            return () if lo is None else (lo + i for i in iter_bits(acc))
+        adjacency = self._comp_pred if direction == "dependents" else self._comp_succ
+        seen = set(comps)
+        stack = list(seen)
+        while stack:
+            for w in adjacency[stack.pop()]:
+                if w not in seen:
+                    seen.add(w)
+                    stack.append(w)
+        return seen
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self._node_index
+
+    def reaches(self, src: str, dst: str) -> bool:
+        """True if src transitively depends on dst (a node reaches itself)."""
+        s, d = self._node_index.get(src), self._node_index.get(dst)
+        if s is None or d is None:
+            return src == dst
+        self._ensure()
+        return self._comp_reaches(self.comp[s], self.comp[d])
+
+    def _expand(self, comps: Iterable[int]) -> Set[str]:
+        return {self.node_ids[v] for c in comps for v in self.members[c]}
+
+    def dependencies(self, node_id: str) -> Set[str]:
+        """Everything node_id transitively depends on (including itself)."""
+        return self.impact((node_id,), direction="dependencies")
+
+    def dependents(self, node_id: str) -> Set[str]:
+        """Everything that transitively depends on node_id (including itself)."""
+        return self.impact((node_id,), direction="dependents")
+
+    def impact(self, node_ids: Iterable[str], max_depth: Optional[int] = None,
+               direction: str = "dependents") -> Set[str]:
+        """
+        Nodes within max_depth dependency hops of node_ids (seeds included).
+
+        Without max_depth this is the union of the precomputed closures (or
+        one search of the condensed graph without them). With it, a BFS runs
+        over the stored adjacency, so the cost is proportional to the size of
+        the answer.
+        """
+        if max_depth is None:
+            comps, out = set(), set()
+            self._ensure()
+            for nid in node_ids:
+                idx = self._node_index.get(nid)
+                if idx is None:
+                    out.add(nid)
+                else:
+                    comps.add(self.comp[idx])
+            return out | self._expand(self._components(comps, direction))
+
+        adjacency = self._pred if direction == "dependents" else self._succ
+        out = set(node_ids)
+        frontier = deque((self._node_index[nid], 0) for nid in out if nid in self._node_index)
+        seen = {v for v, _ in frontier}
+        while frontier:
+            v, depth = frontier.popleft()
+            if depth == max_depth:
+                continue
+            for w in adjacency[v]:
+                if w not in seen:
+                    seen.add(w)
+                    out.add(self.node_ids[w])
+                    frontier.append((w, depth + 1))
+        return out
+
+    # ---- persistence ----
+    # Layout: _MAGIC, a little-endian uint32 header length, a JSON header
+    # (version, labels, fingerprint, node ids, section sizes), then the raw
+    # sections in _SECTIONS order: (src, dst, count) edge triples, each
+    # node's component, and, if kept, each closure's lowest component,
+    # byte length and little-endian bits.
+    _SECTIONS = ("edges", "comp", "down_lo", "down_len", "up_lo", "up_len", "bits")
+
+    def save(self, path: str | Path) -> None:
+        self._ensure()
+        edges = array("I")
+        for s, succ in enumerate(self._succ):
+            for d, k in sorted(succ.items()):
+                edges.extend((s, d, k))
+        sections = {"edges": edges.tobytes(), "comp": array("I", self.comp).tobytes()}
+        if self.down is not None:
+            chunks = []
+            for name, closures, lows in (("down", self.down, self.down_lo),
+                                         ("up", self.up, self.up_lo)):
+                lengths = array("I")
+                for bits in closures:
+                    chunk = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+                    chunks.append(chunk)
+                    lengths.append(len(chunk))
+                sections[f"{name}_lo"] = array("I", lows).tobytes()
+                sections[f"{name}_len"] = lengths.tobytes()
+            sections["bits"] = b"".join(chunks)
+        header = json.dumps({
+            "version": INDEX_VERSION,
+            "labels": sorted(self.labels),
+            "max_closure_bits": self.max_closure_bits,
+            "fingerprint": self.fingerprint,
+            "nodes": self.node_ids,
+            "components": len(self.members),
+            "sizes": {name: len(sections[name]) for name in self._SECTIONS if name in sections},
+        }, ensure_ascii=False).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(_MAGIC + struct.pack("<I", len(header)) + header)
+            for name in self._SECTIONS:
+                if name in sections:
+                    f.write(sections[name])
+
+    @classmethod
+    def load(cls, path: str | Path) -> Optional["ReachabilityIndex"]:
+        """Read a saved index, or None if it's missing or from another version."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        raw = path.read_bytes()
+        if raw[:len(_MAGIC)] != _MAGIC:
+            return None
+        pos = len(_MAGIC) + 4
+        (header_len,) = struct.unpack_from("<I", raw, len(_MAGIC))
+        data = json.loads(raw[pos:pos + header_len].decode("utf-8"))
+        if data.get("version") != INDEX_VERSION:
+            return None
+        pos += header_len
+        sections = {}
+        for name in cls._SECTIONS:
+            size = data["sizes"].get(name)
+            if size is not None:
+                sections[name] = raw[pos:pos + size]
+                pos += size
+
+        def ints(name, typecode="I"):
+            a = array(typecode)
+            a.frombytes(sections[name])
+            return a
+
+        index = cls.__new__(cls)
+        index.labels = frozenset(data["labels"])
+        index.max_closure_bits = data["max_closure_bits"]
+        index.fingerprint = data["fingerprint"]
+        index.node_ids = data["nodes"]
+        index._node_index = dict(zip(index.node_ids, range(len(index.node_ids))))
+        index._succ = [{} for _ in index.node_ids]
+        index._pred = [set() for _ in index.node_ids]
+        edges = ints("edges")
+        for i in range(0, len(edges), 3):
+            index._link(edges[i], edges[i + 1], edges[i + 2])
+        index._condense(array("l", ints("comp")), data["components"])
+        index.down = index.up = index.down_lo = index.up_lo = None
+        if "bits" in sections:
+            bits, offset = sections["bits"], 0
+            for name in ("down", "up"):
+                closures = []
+                for n in ints(f"{name}_len"):
+                    closures.append(int.from_bytes(bits[offset:offset + n], "little"))
+                    offset += n
+                setattr(index, name, closures)
+                setattr(index, f"{name}_lo", array("l", ints(f"{name}_lo")))
+            index._closure_bits = sum(b.bit_length() for b in index.down + index.up)
+        return index
+
+    @classmethod
+    def for_graph_dir(cls, graph_dir: str | Path) -> "ReachabilityIndex":
+        """
+        Index for the edges file in graph_dir, reusing reachability.bin when
+        it was built from the same file, else building and saving a new one.
+        """
+        edges_path = find_graph_file(graph_dir, "edges")
+        if edges_path is None:
+            raise FileNotFoundError(f"No edges.jsonl in {graph_dir}")
+        for name in LEGACY_INDEX_FILES:
+            (Path(graph_dir) / name).unlink(missing_ok=True)
+        st = os.stat(edges_path)
+        fingerprint = [edges_path.name, st.st_size, st.st_mtime_ns]
+        index_path = Path(graph_dir) / INDEX_FILE
+        index = cls.load(index_path)
+        if index is not None and index.fingerprint == fingerprint:
+            return index
+        index = cls(iter_jsonl(edges_path))
+        index.fingerprint = fingerprint
+        index.save(index_path)
+        return index
@@ -0,0 +1,158 @@
+"""
+Lazy access to source text referenced by graph nodes.
+
+Nodes carry only metadata["file_path"] and metadata["byte_range"]; the
+SourceStore memory-maps files on first use and returns slices on demand, so
+neither the analyzer nor nodes.jsonl has to hold copies of the code. Each
+file's module node records metadata["file_sha256"], and slices of a file
+whose content no longer has that hash are refused. Buffers already read by parse_file can be handed
+in with put() instead of being mapped a second time.
+
+file_path is whatever path the analyzer was given, so it is only valid from
+the directory the analysis ran in. With a root, paths that don't resolve are
+matched against the .java files under root through a PathIndex.
+"""
+
+import hashlib
+import mmap
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+from utils.file_utils import PathIndex, find_files
+
+
+class SourceStore:
+    def __init__(self, root: Optional[str | Path] = None, max_open: int = 256,
+                 file_hashes: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            root: Project directory that node file paths are looked up under
+            max_open: Number of files kept mapped at once (least recently used are closed)
+            file_hashes: file_path -> file_sha256 recorded at analysis time; module
+                nodes passed to note_hash() or source_for() are added as they come
+        """
+        self.root = Path(root) if root else None
+        self.max_open = max_open
+        self._maps: "OrderedDict[str, mmap.mmap | bytes]" = OrderedDict()
+        self._index: Optional[PathIndex] = None
+        self._sha256: Dict[str, str] = {}  # file_path -> digest of the bytes served
+        self._expected: Dict[str, str] = dict(file_hashes or {})  # file_path -> digest at analysis time
+        self._skipped = set()
+
+    def _resolve(self, file_path: str) -> Path:
+        p = Path(file_path)
+        if self.root is None or p.is_absolute():
+            return p
+        if (self.root / p).exists():
+            return self.root / p
+        if self._index is None:
+            self._index = PathIndex(f.relative_to(self.root).as_posix() for f in find_files(self.root, (".java",)))
+        match = self._index.lookup(file_path)
+        return self.root / match if match is not None else p
+
+    def buffer(self, file_path: str):
+        """The whole file as a bytes-like object (mmap for non-empty files)."""
+        buf = self._maps.get(file_path)
+        if buf is not None:
+            self._maps.move_to_end(file_path)
+            return buf
+        with open(self._resolve(file_path), "rb") as f:
+            try:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                buf = b""
+        self.put(file_path, buf)
+        return buf
+
+    def put(self, file_path: str, data: bytes) -> None:
+        """Register bytes that were already read (e.g. by parse_file) for file_path."""
+        old = self._maps.pop(file_path, None)
+        if old is not None:
+            self._close(old)
+        self._sha256.pop(file_path, None)
+        self._maps[file_path] = data
+        while len(self._maps) > self.max_open:
+            self._close(self._maps.popitem(last=False)[1])
+
+    def slice(self, file_path: str, start: int, end: int) -> str:
+        """Decoded text for the byte range [start, end) of file_path."""
+        return self.buffer(file_path)[start:end].decode("utf-8")
+
+    def text(self, file_path: str) -> str:
+        """Decoded text of the whole file."""
+        return self.buffer(file_path)[:].decode("utf-8")
+
+    def sha256(self, file_path: str) -> str:
+        """Hex digest of file_path's current content (hashed once per buffer)."""
+        digest = self._sha256.get(file_path)
+        if digest is None:
+            digest = self._sha256[file_path] = hashlib.sha256(self.buffer(file_path)).hexdigest()
+        return digest
+
+    def note_hash(self, node: Dict) -> None:
+        """Remember the file hash a module node records for its file, if any."""
+        metadata = node.get("metadata", {})
+        if metadata.get("file_sha256") and metadata.get("file_path"):
+            self._expected[metadata["file_path"]] = metadata["file_sha256"]
+
+    def source_for(self, node: Dict) -> str:
+        """
+        Source text of a class/interface/method node, or "" if it has none.
+
+        Also "" (with a one-time notice per file) when the file can't be found
+        or no longer has the content hash recorded at analysis time, since the
+        byte range would then point at the wrong text.
+        """
+        self.note_hash(node)
+        metadata = node.get("metadata", {})
+        if metadata.get("source_code"):
+            return metadata["source_code"]
+        byte_range = metadata.get("byte_range")
+        file_path = metadata.get("file_path")
+        if not byte_range or not file_path or file_path in self._skipped:
+            return ""
+        try:
+            expected = self._expected.get(file_path)
+            if expected and self.sha256(file_path) != expected:
+                return self._skip(file_path, "changed since the graph was built")
+            return self.slice(file_path, byte_range[0], byte_range[1])
+        except OSError as e:
+            return self._skip(file_path, f"unreadable ({e.strerror or e})")
+
+    def _skip(self, file_path: str, reason: str) -> str:
+        self._skipped.add(file_path)
+        print(f"  Skipping source of {file_path}: {reason}")
+        return ""
+
+    @staticmethod
+    def _close(buf) -> None:
+        if isinstance(buf, mmap.mmap):
+            buf.close()
+
+    def close(self) -> None:
+        while self._maps:
+            self._close(self._maps.popitem()[1])
+        self._sha256.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def inline_source(nodes: Iterable[Dict], store: SourceStore) -> Iterator[Dict]:
+    """
+    Yield copies of nodes with metadata["source_code"] filled in from store.
+
+    Each file's module node must come before its other nodes (as in
+    Analyzer.nodes) for the file's hash to be checked.
+    """
+    for node in nodes:
+        store.note_hash(node)
+        metadata = node.get("metadata", {})
+        if "byte_range" not in metadata:
+            yield node
+            continue
+        yield {**node, "metadata": {**metadata, "source_code": store.source_for(node)}}
@@ -2,23 +2,45 @@
 Extract focused subgraphs from the full dependency graph.
 """
 
-from typing import List, Dict, Set
-from collections import defaultdict
+from typing import List, Dict, Iterable, Optional, Set
+from collections import deque
+
+from dependency_graph.graph_store import GraphStore
+from dependency_graph.reachability import DEPENDENCY_LABELS as IMPACT_LABELS
+
+# Edge labels followed from seeds towards what they depend on / what depends on them
+DEPENDENCY_LABELS = frozenset({"Calls", "Uses", "Instantiates", "BaseClassOf", "Implements"})
+DEPENDENT_LABELS = frozenset({"CalledBy", "UsedBy", "InstantiatedBy", "DerivedClassOf", "ImplementedBy"})
 
 
 class SubgraphExtractor:
-    def __init__(self, nodes: List[Dict], edges: List[Dict]):
-        """Initialize with full dependency graph"""
-        self.all_nodes = {n["id"]: n for n in nodes}
-        self.all_edges = edges
+    def __init__(self, nodes: Iterable[Dict | str], edges: Iterable[Dict], reachability=None):
+        """
+        Initialize with full dependency graph
 
-        # Build adjacency lists for efficient traversal
-        self.outgoing = defaultdict(list)  # src -> [(label, dst)]
-        self.incoming = defaultdict(list)  # dst -> [(label, src)]
+        Both iterables are consumed once, so they can stream straight from
+        nodes.jsonl/edges.jsonl; edges are kept in a compact GraphStore.
 
+        Args:
+            nodes: Graph nodes, or only their ids when the caller looks the
+                selected nodes up itself (see select())
+            edges: Graph edges
+            reachability: Optional ReachabilityIndex answering impact() queries
+        """
+        self.reachability = reachability
+        self.all_nodes = {}
+        self._node_order = {}
+        for node in nodes:
+            nid = node if isinstance(node, str) else node["id"]
+            self._node_order.setdefault(nid, len(self._node_order))
+            if not isinstance(node, str):
+                self.all_nodes[nid] = node
+
+        # Edge positions in the store double as edge indices, so induced edges
+        # come straight from its out-lists in their original order
+        self.graph = GraphStore()
         for edge in edges:
-            self.outgoing[edge["src"]].append((edge["label"], edge["dst"]))
-            self.incoming[edge["dst"]].append((edge["label"], edge["src"]))
+            self.graph.add_edge(edge["src"], edge["label"], edge["dst"], edge.get("resolved", True))
 
     def extract_focused_subgraph(
         self,
@@ -37,57 +59,101 @@ class SubgraphExtractor:
             max_depth: Maximum traversal depth in each direction
 
         Returns:
-            (nodes, edges) - Subgraph nodes and edges
+            (nodes, edges) - Subgraph nodes in graph order and the edges among
+            them in their original order
         """
+        node_ids, edges = self.select(seed_node_ids, include_dependencies, include_dependents,
+                                      max_depth)
+        return [self.all_nodes[nid] for nid in node_ids], edges
+
+    def select(
+        self,
+        seed_node_ids: Set[str],
+        include_dependencies: bool = True,
+        include_dependents: bool = True,
+        max_depth: int = 2
+    ) -> tuple[List[str], List[Dict]]:
+        """Like extract_focused_subgraph, but returns the subgraph's node ids."""
         relevant_nodes = set(seed_node_ids)
 
         # Expand to include dependencies (what these nodes use/call)
         if include_dependencies:
-            relevant_nodes.update(
-                self._traverse(seed_node_ids, self.outgoing, max_depth,
-                              edge_types=["Calls", "Uses", "Instantiates", "BaseClassOf", "Implements"])
-            )
+            visited = self._traverse(seed_node_ids, "out", max_depth, DEPENDENCY_LABELS)
+            relevant_nodes.update(visited)
 
         # Expand to include dependents (what uses/calls these nodes)
         if include_dependents:
-            relevant_nodes.update(
-                self._traverse(seed_node_ids, self.incoming, max_depth,
-                              edge_types=["CalledBy", "UsedBy", "InstantiatedBy", "DerivedClassOf", "ImplementedBy"])
-            )
+            visited = self._traverse(seed_node_ids, "in", max_depth, DEPENDENT_LABELS)
+            relevant_nodes.update(visited)
 
         # Extract nodes and edges for the subgraph
-        subgraph_nodes = [self.all_nodes[nid] for nid in relevant_nodes if nid in self.all_nodes]
-        subgraph_edges = [
-            e for e in self.all_edges
-            if e["src"] in relevant_nodes and e["dst"] in relevant_nodes
-        ]
+        node_ids = sorted((n for n in relevant_nodes if n in self._node_order),
+                          key=self._node_order.__getitem__)
+        subgraph_edges = [self.graph.edge(i) for i in self._induced_edges(relevant_nodes)]
+
+        print(f"📊 Subgraph: {len(node_ids)} nodes, {len(subgraph_edges)} edges")
 
-        print(f"📊 Subgraph: {len(subgraph_nodes)} nodes, {len(subgraph_edges)} edges")
+        return node_ids, subgraph_edges
 
-        return subgraph_nodes, subgraph_edges
+    def impact(self, seed_node_ids: Iterable[str], max_depth: Optional[int] = None,
+               direction: str = "dependents") -> Set[str]:
+        """
+        What transitively depends on the seeds ("dependents") or what they
+        depend on ("dependencies"), over Calls/Uses/Instantiates/Implements
+        edges, optionally limited to max_depth hops.
+
+        Uses the precomputed reachability index when one was given.
+        """
+        if self.reachability is not None:
+            return self.reachability.impact(seed_node_ids, max_depth, direction)
+        return self._traverse(
+            seed_node_ids, "in" if direction == "dependents" else "out",
+            -1 if max_depth is None else max_depth, IMPACT_LABELS,
+        )
+
+    def _induced_edges(self, node_ids: Set[str]) -> List[int]:
+        """Indices of edges with both ends in node_ids, from their out-lists."""
+        g = self.graph
+        offsets, positions = g.csr("out")
+        inside = {g.node_index(nid) for nid in node_ids} - {None}
+        found = [i for n in inside for i in positions[offsets[n]:offsets[n + 1]]
+                 if g.dst[i] in inside]
+        found.sort()
+        return found
 
     def _traverse(
         self,
-        start_nodes: Set[str],
-        adjacency: Dict[str, List],
+        start_nodes: Iterable[str],
+        direction: str,
         max_depth: int,
-        edge_types: List[str]
+        edge_types: frozenset
     ) -> Set[str]:
-        """BFS traversal to find connected nodes"""
-        visited = set()
-        queue = [(node, 0) for node in start_nodes]
+        """
+        Multi-source BFS up to max_depth hops along edges labelled edge_types.
 
-        while queue:
-            current, depth = queue.pop(0)
-            if current in visited or depth > max_depth:
+        direction "out" follows src -> dst, "in" follows dst -> src; a negative
+        max_depth means unbounded. Returns the visited node ids, seeds
+        included.
+        """
+        g = self.graph
+        offsets, positions = g.csr(direction)
+        other = g.dst if direction == "out" else g.src
+        codes = {g.label_code(label) for label in edge_types}
+        visited = set(start_nodes)
+        seen = {g.node_index(nid) for nid in visited} - {None}
+        frontier = deque((node, 0) for node in seen)
+
+        while frontier:
+            current, depth = frontier.popleft()
+            if depth == max_depth:
                 continue
-
-            visited.add(current)
-
-            # Add neighbors based on edge type filter
-            for label, neighbor in adjacency[current]:
-                if label in edge_types and neighbor not in visited:
-                    queue.append((neighbor, depth + 1))
+            for i in positions[offsets[current]:offsets[current + 1]]:
+                if g.label[i] not in codes:
+                    continue
+                neighbor = other[i]
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    visited.add(g.node_ids[neighbor])
+                    frontier.append((neighbor, depth + 1))
 
         return visited
-
@@ -0,0 +1,96 @@
+"""
+Compact per-file symbol summaries for LLM prompts.
+
+A digest lists what a file declares and touches -- package, types with their
+supertypes, field types, method signatures, called method names and
+instantiated types -- built from parse_file() output. It is a fraction of
+the size of the raw source and skips license headers and bodies, which makes
+it a better input for mandate relevance checks.
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Dict, Optional
+
+from dependency_graph.java_parser import grammar_version, parse_file
+
+# Bump whenever symbol_digest() output changes so cached digests are rebuilt.
+DIGEST_VERSION = 1
+
+
+def symbol_digest(symbols: Dict) -> str:
+    """Render parse_file()["symbols"] as a short, line-oriented summary."""
+    lines = [f"package {symbols.get('package', '<default>')}"]
+    imports = [imp.rsplit(".", 1)[-1] for imp in symbols.get("imports", [])]
+    if imports:
+        lines.append("imports " + ", ".join(imports))
+
+    fields_by_owner, methods_by_owner = {}, {}
+    for f in symbols.get("fields", []):
+        fields_by_owner.setdefault(f["owner_fqn"], []).append(f)
+    for m in symbols.get("methods", []):
+        methods_by_owner.setdefault(m["owner_fqn"], []).append(m)
+
+    for t in symbols.get("types", []):
+        header = f"{t['kind']} {t['name']}"
+        if t.get("extends"):
+            header += " extends " + ", ".join(t["extends"])
+        if t.get("implements"):
+            header += " implements " + ", ".join(t["implements"])
+        lines.append(header)
+        for f in fields_by_owner.get(t["fqn"], []):
+            lines.append(f"  {f.get('type') or '?'} {f['name']}")
+        for m in methods_by_owner.get(t["fqn"], []):
+            ret = f"{m['return_type']} " if m.get("return_type") else ""
+            lines.append(f"  {ret}{m['name']}({', '.join(m.get('params', []))})")
+
+    calls, news = set(), set()
+    for st in symbols.get("stmts", []):
+        if st["kind"] == "call" and st["parts"].get("name"):
+            calls.add(st["parts"]["name"])
+        elif st["kind"] == "new" and st["parts"].get("type"):
+            news.add(st["parts"]["type"])
+    if calls:
+        lines.append("calls " + ", ".join(sorted(calls)))
+    if news:
+        lines.append("creates " + ", ".join(sorted(news)))
+    return "\n".join(lines)
+
+
+class DigestCache:
+    """
+    Digests keyed by file content hash, stored in a BlobStore.
+
+    Pass a ParseCache's store to keep digests next to the parse results, or
+    any other BlobStore (keys are prefixed "digest:" so they can share one).
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._version = None
+
+    def _key(self, sha256: str) -> str:
+        if self._version is None:
+            self._version = f"{DIGEST_VERSION}:{grammar_version()}"
+        return f"digest:{sha256}:{self._version}"
+
+    def get(self, sha256: str) -> Optional[str]:
+        raw = self.store.get(self._key(sha256))
+        return None if raw is None else raw.decode("utf-8")
+
+    def put(self, sha256: str, digest: str) -> None:
+        self.store.put(self._key(sha256), digest.encode("utf-8"))
+
+
+def file_digest(path: str | Path, parse_cache=None, digest_cache: Optional[DigestCache] = None) -> str:
+    """Digest of one Java file, reading it once and parsing only on a cache miss."""
+    data = Path(path).read_bytes()
+    sha = hashlib.sha256(data).hexdigest() if digest_cache is not None else None
+    if sha is not None:
+        digest = digest_cache.get(sha)
+        if digest is not None:
+            return digest
+    digest = symbol_digest(parse_file(path, parse_cache, data=data)["symbols"])
+    if sha is not None:
+        digest_cache.put(sha, digest)
+    return digest
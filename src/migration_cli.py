@@ -16,6 +16,8 @@ from typing import Optional
 sys.path.insert(0, os.path.dirname(__file__))
 
 from dependency_graph.migration_engine import MigrationEngine
+from dependency_graph.parse_cache import ParseCache
+from dependency_graph.description_cache import DescriptionCache
 
 
 def main():
@@ -96,6 +98,16 @@ Environment Variables:
         help="OpenAI API key (overrides OPENAI_API_KEY env var)"
     )
     
+    parser.add_argument(
+        "--parse-cache",
+        help="SQLite file caching parse results by content hash (shared with java-dep-analyze)"
+    )
+    
+    parser.add_argument(
+        "--description-cache",
+        help="SQLite file caching LLM function descriptions (shared with java-knowledge-graph)"
+    )
+    
     parser.add_argument(
         "--verbose",
         "-v",
@@ -127,7 +139,10 @@ Environment Variables:
             openai_api_key=args.openai_key or os.getenv("OPENAI_API_KEY"),
             jira_base_url=args.jira_url or os.getenv("JIRA_BASE_URL"),
             jira_api_token=args.jira_token or os.getenv("JIRA_API_TOKEN"),
-            llm_model=args.model
+            llm_model=args.model,
+            parse_cache=ParseCache(args.parse_cache) if args.parse_cache else None,
+            description_cache=(DescriptionCache(args.description_cache)
+                               if args.description_cache else None)
         )
     except Exception as e:
         print(f"❌ Error initializing migration engine: {e}")
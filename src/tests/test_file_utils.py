@@ -0,0 +1,106 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.file_utils import PathIndex, find_files
+
+
+def make_tree(root, files):
+    for rel, text in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def rels(root, paths):
+    return [p.relative_to(root).as_posix() for p in paths]
+
+
+def test_build_dirs_pruned_only_at_module_roots(tmp_path):
+    make_tree(tmp_path, {
+        "pom.xml": "",
+        "src/main/java/com/acme/build/Builder.java": "",
+        "com/acme/target/T.java": "",
+        "build/Gen.java": "",
+        "target/classes/Gen.java": "",
+        "node_modules/x/Y.java": "",
+        "sub/build.gradle": "",
+        "sub/build/Gen.java": "",
+        "sub/src/A.java": "",
+        ".git/objects/X.java": "",
+    })
+    assert rels(tmp_path, find_files(tmp_path)) == [
+        "com/acme/target/T.java",
+        "src/main/java/com/acme/build/Builder.java",
+        "sub/src/A.java",
+    ]
+
+
+def test_user_excludes_match_name_or_path(tmp_path):
+    make_tree(tmp_path, {
+        "a/gen/G.java": "",
+        "a/src/A.java": "",
+        "b/gen/H.java": "",
+        "b/B_test.java": "",
+    })
+    found = find_files(tmp_path, excludes=("a/gen", "*_test.java"))
+    assert rels(tmp_path, found) == ["a/src/A.java", "b/gen/H.java"]
+
+
+def test_gitignore_rules_and_negation(tmp_path):
+    make_tree(tmp_path, {
+        ".gitignore": "*.java\n!Keep.java\n/top/\nnotes.txt/\ndocs/**/Old.java\n",
+        "Keep.java": "",
+        "Drop.java": "",
+        "top/Keep.java": "",
+        "nested/top/Keep.java": "",
+        "notes.txt": "",  # a file, so the dir-only rule doesn't apply
+        "x/notes.txt/Keep.java": "",  # excluded directory: '!' can't re-include below it
+        "docs/Old.java": "",
+        "pkg/.gitignore": "!Drop.java\n",
+        "pkg/Drop.java": "",
+    })
+    found = find_files(tmp_path, (".java", ".txt"))
+    assert rels(tmp_path, found) == ["Keep.java", "nested/top/Keep.java", "notes.txt", "pkg/Drop.java"]
+    assert rels(tmp_path, find_files(tmp_path, gitignore=False)) == [
+        "Drop.java", "Keep.java", "docs/Old.java", "nested/top/Keep.java", "pkg/Drop.java",
+        "top/Keep.java", "x/notes.txt/Keep.java",
+    ]
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+def test_git_listing_matches_walk(tmp_path):
+    make_tree(tmp_path, {
+        ".gitignore": "ignored/\n",
+        "pom.xml": "",
+        "ignored/I.java": "",
+        "target/T.java": "",
+        "src/com/acme/build/B.java": "",
+        "src/com/acme/A.java": "",
+    })
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    walked = rels(tmp_path, find_files(tmp_path))
+    assert rels(tmp_path, find_files(tmp_path, use_git=True)) == walked
+    assert walked == ["src/com/acme/A.java", "src/com/acme/build/B.java"]
+
+
+def test_path_index_lookup_order():
+    index = PathIndex([
+        "src/com/acme/A.java",
+        "/abs/project/src/com/acme/B.java",
+        "com/other/A.java",
+    ])
+    # exact match, modulo separators and "./"
+    assert index.lookup("./src\\com/acme/A.java") == "src/com/acme/A.java"
+    # a key that is a suffix of the query
+    assert index.lookup("/checkout/src/com/acme/A.java") == "src/com/acme/A.java"
+    assert index.lookup("/elsewhere/com/other/A.java") == "com/other/A.java"
+    # a key that ends with the query
+    assert index.lookup("acme/B.java") == "/abs/project/src/com/acme/B.java"
+    assert index.lookup("src/com/acme/C.java") is None
+    assert index.lookup("Missing.java") is None
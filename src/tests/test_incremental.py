@@ -0,0 +1,110 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from dependency_graph.analyzer import index_repo
+from dependency_graph.dependency_analyzer import Analyzer
+from dependency_graph.incremental import STATE_DB, analyze_incremental
+
+pytestmark = pytest.mark.skipif(not Path("build/languages.so").exists(),
+                                reason="Java grammar not built (run from the repo root)")
+
+SOURCES = {
+    "com/acme/Base.java": """package com.acme;
+public class Base {
+    public void run(int n) { helper(n, 1); }
+    public int helper(int a, int b) { return a + b; }
+}
+""",
+    "com/acme/Shape.java": """package com.acme;
+public interface Shape { double area(); }
+""",
+    "com/acme/Square.java": """package com.acme;
+public class Square extends Base implements Shape {
+    public double area() { return 1.0; }
+    public void run(int n) { new Base().run(n); }
+}
+""",
+    "com/acme/app/Main.java": """package com.acme.app;
+import com.acme.Square;
+import com.acme.Shape;
+public class Main {
+    public void go() { Shape s = new Square(); s.area(); }
+}
+""",
+}
+
+
+def write(root, files):
+    for rel, text in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def snapshot(an):
+    nodes = sorted(n["id"] for n in an.nodes)
+    edges = sorted((e["src"], e["label"], e["dst"], e["resolved"]) for e in an.edges)
+    return nodes, edges
+
+
+def full(repo):
+    an = Analyzer()
+    an.files = index_repo(repo)
+    return an.run()
+
+
+def test_update_files_matches_full_rebuild(tmp_path):
+    repo, cache = tmp_path / "repo", tmp_path / "cache"
+    write(repo, SOURCES)
+    assert snapshot(analyze_incremental(repo, cache)) == snapshot(full(repo))
+
+    edits = [
+        # rename a method other files call
+        {"com/acme/Base.java": SOURCES["com/acme/Base.java"].replace("helper", "helper2")},
+        # change the superclass
+        {"com/acme/Square.java": SOURCES["com/acme/Square.java"].replace(" extends Base", "")},
+        # add a subclass that overrides an inherited method
+        {"com/acme/app/Cube.java": """package com.acme.app;
+import com.acme.Square;
+public class Cube extends Square {
+    public double area() { return 6.0; }
+}
+"""},
+    ]
+    for edit in edits:
+        write(repo, edit)
+        assert snapshot(analyze_incremental(repo, cache)) == snapshot(full(repo))
+
+    (repo / "com/acme/Shape.java").unlink()
+    assert snapshot(analyze_incremental(repo, cache)) == snapshot(full(repo))
+
+
+def test_unchanged_run_writes_nothing(tmp_path, capsys):
+    repo, cache = tmp_path / "repo", tmp_path / "cache"
+    write(repo, SOURCES)
+    first = snapshot(analyze_incremental(repo, cache))
+    db = cache / STATE_DB
+    before = {p.name: p.stat().st_mtime_ns for p in cache.iterdir() if p.name.startswith(db.name)}
+
+    assert snapshot(analyze_incremental(repo, cache)) == first
+    assert "no changes" in capsys.readouterr().out
+    after = {p.name: p.stat().st_mtime_ns for p in cache.iterdir() if p.name.startswith(db.name)}
+    assert after == before
+
+
+def test_edges_from_several_files_survive_reload(tmp_path):
+    # the same class in two source roots: both files produce its edges
+    repo, cache = tmp_path / "repo", tmp_path / "cache"
+    write(repo, SOURCES)
+    write(repo, {f"alt/{rel}": text for rel, text in SOURCES.items() if "app/" not in rel})
+    assert snapshot(analyze_incremental(repo, cache)) == snapshot(full(repo))
+
+    (repo / "alt/com/acme/Base.java").unlink()
+    assert snapshot(analyze_incremental(repo, cache)) == snapshot(full(repo))
+    write(repo, {"com/acme/Square.java": SOURCES["com/acme/Square.java"] + "\n"})
+    assert snapshot(analyze_incremental(repo, cache)) == snapshot(full(repo))
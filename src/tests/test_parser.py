@@ -1,3 +1,4 @@
+import argparse
 import json
 import sys
 import os
@@ -8,33 +9,135 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from dependency_graph.analyzer import index_repo
 from dependency_graph.dependency_analyzer import Analyzer
+from dependency_graph.incremental import analyze_incremental
+from dependency_graph.java_parser import json_default
+from dependency_graph.parse_cache import ParseCache
 from dependency_graph.dot_exporter import to_dot
+from dependency_graph.graph_io import GRAPH_SUFFIXES, write_jsonl
+from dependency_graph.source_store import SourceStore, inline_source
+from dependency_graph.reachability import INDEX_FILE, LEGACY_INDEX_FILES, ReachabilityIndex
 
 def main():
-    repo = Path(sys.argv[1])
+    parser = argparse.ArgumentParser(
+        description="Build the dependency graph for a Java project."
+    )
+    parser.add_argument("repo", type=Path, help="Path to the Java project to analyze")
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes used to parse files and resolve "
+             "calls/type usage (default: 1)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Reuse parse results and graph state from this directory and only "
+             "re-analyze files whose content changed since the last run",
+    )
+    parser.add_argument(
+        "--parse-cache",
+        type=Path,
+        default=None,
+        help="SQLite file caching parse results by content hash "
+             "(shareable with java-knowledge-graph and java-dep-migrate)",
+    )
+    parser.add_argument(
+        "--compress",
+        choices=["gz", "zst"],
+        default=None,
+        help="Write nodes/edges as nodes.jsonl.gz / .zst instead of plain JSONL",
+    )
+    parser.add_argument(
+        "--git-files",
+        action="store_true",
+        help="List sources with `git ls-files` instead of walking the directory",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Skip files/directories matching this glob (by name or repo-relative "
+             "path); repeatable. VCS metadata and build output are always skipped",
+    )
+    parser.add_argument(
+        "--reachability",
+        action="store_true",
+        help="Also build reachability.bin, a precomputed index for impact queries",
+    )
+    parser.add_argument(
+        "--dispatch",
+        choices=["static", "cha", "rta"],
+        default="static",
+        help="Also link virtual calls to overriding methods in subtypes: all of "
+             "them (cha) or only instantiated ones (rta); not with --cache-dir",
+    )
+    parser.add_argument(
+        "--cycles",
+        action="store_true",
+        help="Also detect dependency cycles (SCCs) between methods, classes and "
+             "packages, tag member nodes with metadata.scc and write cycles.json",
+    )
+    parser.add_argument(
+        "--inline-source",
+        action="store_true",
+        help="Embed each class/method's source text in nodes.jsonl "
+             "(by default nodes only carry file_path + byte_range)",
+    )
+    args = parser.parse_args()
+    if args.cache_dir and args.dispatch != "static":
+        parser.error("--dispatch cha/rta can't be combined with --cache-dir")
+
+    repo = args.repo
     out = Path("tmp/graph_out")
     out.mkdir(parents=True, exist_ok=True)
 
-    files = index_repo(repo)
+    parse_cache = ParseCache(args.parse_cache) if args.parse_cache else None
+    if args.cache_dir:
+        an = analyze_incremental(repo, args.cache_dir, workers=args.jobs,
+                                 parse_cache=parse_cache, excludes=args.exclude,
+                                 use_git=args.git_files)
+        files = an.files
+    else:
+        files = index_repo(repo, workers=args.jobs, cache=parse_cache,
+                           use_git=args.git_files, excludes=args.exclude)
+        an = Analyzer(dispatch=args.dispatch)
+        an.files = files
+        an.run(on_stage=lambda name, secs: print(f"  {name}: {secs:.2f}s"),
+               workers=args.jobs)
+
+    if args.cycles:
+        cycles = an.stage6_cycles()
+        (out / "cycles.json").write_text(json.dumps(cycles, indent=2, ensure_ascii=False))
+        print("Cycles:", {level: len(comps) for level, comps in cycles.items()})
+    else:
+        (out / "cycles.json").unlink(missing_ok=True)
+
     # write symbol tables for inspection
     (out / "symbol_tables.json").write_text(
-        json.dumps(files, indent=2, ensure_ascii=False)
+        json.dumps(files, indent=2, ensure_ascii=False, default=json_default)
     )
 
-    an = Analyzer()
-    an.files = files
-    an.stage1_add_syntactic()
-    an.stage2_build_symbols()
-    an.stage3_cha_and_overrides()
-    an.stage3b_implements()
-    an.stage4_calls_and_news()
-    an.stage5_type_usage()
-
-    # dump nodes/edges
-    with open(out/"nodes.jsonl","w") as f:
-        for n in an.nodes: f.write(json.dumps(n)+"\n")
-    with open(out/"edges.jsonl","w") as f:
-        for e in an.edges: f.write(json.dumps(e)+"\n")
+    # dump nodes/edges (drop other framings so readers can't pick up a stale copy)
+    suffix = f".jsonl.{args.compress}" if args.compress else ".jsonl"
+    for stem in ("nodes", "edges"):
+        for other in GRAPH_SUFFIXES:
+            if other != suffix:
+                (out / f"{stem}{other}").unlink(missing_ok=True)
+    if args.inline_source:
+        with SourceStore() as sources:
+            write_jsonl(out / f"nodes{suffix}", inline_source(an.nodes, sources))
+    else:
+        write_jsonl(out / f"nodes{suffix}", an.nodes)
+    write_jsonl(out / f"edges{suffix}", an.edges)
+    if args.reachability:
+        ReachabilityIndex.for_graph_dir(out)
+    else:
+        # an index built from an older edges file must not be picked up
+        for name in (INDEX_FILE,) + LEGACY_INDEX_FILES:
+            (out / name).unlink(missing_ok=True)
 
     # dot
     to_dot(an.nodes, an.edges, str(out/"dep"), str(out/"dep"))
@@ -73,8 +176,8 @@ def verify_metadata_completeness(nodes):
                 pass
             if "params" not in metadata:
                 issues.append(f"{node_id}: missing params")
-            if not metadata.get("source_code"):
-                issues.append(f"{node_id}: missing source_code")
+            if not metadata.get("byte_range") and not metadata.get("source_code"):
+                issues.append(f"{node_id}: missing byte_range")
 
     if issues:
         print(f"WARNING: Found {len(issues)} metadata issues:")
@@ -0,0 +1,88 @@
+import os
+import random
+import sys
+from collections import defaultdict
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from dependency_graph.reachability import ReachabilityIndex
+
+
+def bfs(edges, start, reverse=False):
+    adjacency = defaultdict(set)
+    for s, d in edges:
+        if reverse:
+            s, d = d, s
+        adjacency[s].add(d)
+    seen, stack = {start}, [start]
+    while stack:
+        for w in adjacency[stack.pop()]:
+            if w not in seen:
+                seen.add(w)
+                stack.append(w)
+    return seen
+
+
+def check(index, edges, nodes):
+    for v in nodes:
+        assert index.dependencies(v) == bfs(edges, v)
+        assert index.dependents(v) == bfs(edges, v, reverse=True)
+    for v in nodes[:5]:
+        for w in nodes[-5:]:
+            assert index.reaches(v, w) == (w in bfs(edges, v))
+
+
+def edge(s, d):
+    return {"src": s, "label": "Calls", "dst": d}
+
+
+@pytest.mark.parametrize("max_closure_bits", [1 << 20, 0])
+def test_incremental_updates_match_bfs(max_closure_bits):
+    rng = random.Random(max_closure_bits)
+    nodes = [f"n{i}" for i in range(40)]
+    edges = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(30)]
+    index = ReachabilityIndex((edge(s, d) for s, d in edges), max_closure_bits=max_closure_bits)
+    assert index.has_closures == bool(max_closure_bits)
+    check(index, edges, nodes)
+
+    for step in range(60):
+        if step % 4 == 3 and edges:
+            s, d = edges.pop(rng.randrange(len(edges)))  # a parallel copy may remain
+            index.remove_edge(s, "Calls", d)
+        else:
+            s, d = rng.choice(nodes), rng.choice(nodes + ["new%d" % step])
+            edges.append((s, d))
+            index.add_edge(s, "Calls", d)
+            if d not in nodes:
+                nodes.append(d)
+        index.add_edge(s, "ImplementedBy", d)  # not a dependency label: ignored
+        check(index, edges, nodes)
+
+
+def test_closure_budget_falls_back_to_search():
+    chain = [edge(f"n{i}", f"n{i + 1}") for i in range(300)]
+    assert ReachabilityIndex(chain).has_closures
+    index = ReachabilityIndex(chain, max_closure_bits=2000)
+    assert not index.has_closures
+    assert index.dependencies("n290") == {f"n{i}" for i in range(290, 301)}
+    assert index.reaches("n0", "n300") and not index.reaches("n300", "n0")
+    assert index.impact(["n150"], max_depth=2) == {"n148", "n149", "n150"}
+
+
+@pytest.mark.parametrize("max_closure_bits", [1 << 20, 0])
+def test_save_and_load_round_trip(tmp_path, max_closure_bits):
+    rng = random.Random(3)
+    nodes = [f"n{i}" for i in range(50)]
+    edges = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(80)]
+    index = ReachabilityIndex((edge(s, d) for s, d in edges), max_closure_bits=max_closure_bits)
+    index.fingerprint = ["edges.jsonl", 1, 2]
+    index.save(tmp_path / "reachability.bin")
+
+    loaded = ReachabilityIndex.load(tmp_path / "reachability.bin")
+    assert loaded.fingerprint == index.fingerprint
+    assert loaded.has_closures == index.has_closures
+    check(loaded, edges, nodes)
+    loaded.add_edge("n0", "Calls", "n49")
+    check(loaded, edges + [("n0", "n49")], nodes)
@@ -0,0 +1,163 @@
+"""
+SQLite-backed key -> blob store with size-bounded LRU eviction.
+
+Values are zlib-compressed; the running total of stored bytes is kept by
+triggers so eviction never has to scan the table. Safe to share between
+threads and processes (each process opens its own connection).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key     TEXT PRIMARY KEY,
+    data    BLOB NOT NULL,
+    size    INTEGER NOT NULL,
+    created REAL NOT NULL,
+    used    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_used ON entries(used);
+CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS entries_ins AFTER INSERT ON entries
+    BEGIN UPDATE meta SET total = total + new.size; END;
+CREATE TRIGGER IF NOT EXISTS entries_del AFTER DELETE ON entries
+    BEGIN UPDATE meta SET total = total - old.size; END;
+"""
+
+
+class BlobStore:
+    def __init__(self, path: str | Path, max_bytes: Optional[int] = 512 * 1024 * 1024,
+                 ttl: Optional[float] = None):
+        """
+        Args:
+            path: SQLite database file (created on first use)
+            max_bytes: Evict least recently used entries beyond this many stored bytes
+                (None: never evict, for state that must not be dropped)
+            ttl: Optional lifetime in seconds; older entries count as misses
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # connections don't survive pickling; workers reopen lazily
+        state = self.__dict__.copy()
+        state["_conn"] = state["_pid"] = state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT data, created FROM entries WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row and self.ttl is not None and now - row[1] > self.ttl:
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            db.execute("UPDATE entries SET used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return zlib.decompress(row[0])
+
+    def put(self, key: str, value: bytes) -> None:
+        self.update([(key, value)])
+
+    def update(self, items: Iterable[Tuple[str, bytes]] = (), delete: Iterable[str] = ()) -> None:
+        """Write several entries and delete others in one transaction."""
+        now = time.time()
+        rows = [(key, zlib.compress(value)) for key, value in items]
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany("DELETE FROM entries WHERE key = ?",
+                               [(key,) for key in delete] + [(key,) for key, _ in rows])
+                db.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?)",
+                               [(key, data, len(data), now, now) for key, data in rows])
+                self._evict(db)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, bytes]]:
+        """(key, value) of every entry whose key starts with prefix, in key order."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT key, data FROM entries WHERE key >= ? AND key < ? ORDER BY key",
+                (prefix, prefix + "\U0010ffff"),
+            ).fetchall()
+        for key, data in rows:
+            yield key, zlib.decompress(data)
+
+    def keys(self, prefix: str) -> list:
+        """Keys of the entries that start with prefix, in key order."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT key FROM entries WHERE key >= ? AND key < ? ORDER BY key",
+                (prefix, prefix + "\U0010ffff"),
+            ).fetchall()
+        return [key for key, in rows]
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        if self.max_bytes is None:
+            return
+        total = db.execute("SELECT total FROM meta").fetchone()[0]
+        while total > self.max_bytes:
+            rows = db.execute("SELECT key, size FROM entries ORDER BY used LIMIT 64").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def get_json(self, key: str) -> Any:
+        raw = self.get(key)
+        return None if raw is None else json.loads(raw)
+
+    def put_json(self, key: str, value: Any) -> None:
+        self.put(key, json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    def stats(self) -> dict:
+        with self._lock:
+            db = self._db()
+            count = db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            total = db.execute("SELECT total FROM meta").fetchone()[0]
+        return {"entries": count, "bytes": total, "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -1,5 +1,209 @@
+import os
+import re
+import subprocess
+from fnmatch import translate
 from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
 
-def find_files(root: str | Path, exts=(".java",)) -> list[Path]:
+# Version-control metadata, skipped at any depth (never a valid package name).
+DEFAULT_EXCLUDES = (".git", ".hg", ".svn")
+# Build-output directories. Only pruned at the project root or next to a build
+# file, so packages that happen to be called "build" or "target" are kept.
+BUILD_OUTPUT_DIRS = ("build", "target", "node_modules")
+BUILD_FILES = ("pom.xml", "build.gradle", "build.gradle.kts", "settings.gradle",
+               "settings.gradle.kts", "build.xml")
+
+
+class _IgnoreRule:
+    """One .gitignore line, compiled. Matched against paths relative to base."""
+    __slots__ = ("base", "regex", "negate", "dir_only", "anchored")
+
+    def __init__(self, base: str, pattern: str):
+        self.base = base
+        self.negate = pattern.startswith("!")
+        if self.negate:
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        # a slash anywhere but the end anchors the pattern to the .gitignore's directory
+        self.anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        if pattern.startswith("**/"):
+            pattern, self.anchored = pattern[3:], False
+        regex = translate(pattern)
+        if "/**/" in pattern:  # "a/**/b" also matches "a/b"
+            regex = f"(?:{regex})|(?:{translate(pattern.replace('/**/', '/'))})"
+        self.regex = re.compile(regex)
+
+    def matches(self, rel: str, name: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            if not rel.startswith(self.base + "/"):
+                return False
+            rel = rel[len(self.base) + 1:]
+        return bool(self.regex.match(rel if self.anchored else name))
+
+
+def _read_gitignore(directory: str, base: str) -> List[_IgnoreRule]:
+    try:
+        with open(os.path.join(directory, ".gitignore"), encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+    rules = []
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("\\"):  # escaped leading '#' or '!'
+            line = line[1:]
+        rules.append(_IgnoreRule(base, line))
+    return rules
+
+
+def _ignored(rules: Iterable[_IgnoreRule], rel: str, name: str, is_dir: bool) -> bool:
+    ignored = False
+    for rule in rules:  # last matching rule wins, so '!' lines can re-include
+        if rule.matches(rel, name, is_dir):
+            ignored = not rule.negate
+    return ignored
+
+
+def _excluded(patterns: Tuple[re.Pattern, ...], rel: str, name: str) -> bool:
+    return any(p.match(name) or p.match(rel) for p in patterns)
+
+
+def _git_ls_files(root: Path) -> Optional[List[str]]:
+    """Tracked plus untracked-but-not-ignored files under root, or None outside git."""
+    try:
+        out = subprocess.run(
+            ["git", "-C", str(root), "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+            capture_output=True, check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return [p for p in out.decode("utf-8", "surrogateescape").split("\0") if p]
+
+
+def iter_files(root: str | Path, exts=(".java",), excludes: Iterable[str] = (),
+               gitignore: bool = True, use_git: bool = False,
+               build_dirs: Iterable[str] = BUILD_OUTPUT_DIRS) -> Iterator[Path]:
+    """Yield files under root whose suffix is in exts, in sorted path order.
+
+    Walks with os.scandir and prunes directories matching DEFAULT_EXCLUDES,
+    an exclude glob (by name or root-relative path) or a .gitignore rule, so
+    large ignored trees are never listed. build_dirs are pruned only at root
+    or in a directory holding one of BUILD_FILES (a module root). Paths are
+    yielded as they are found; with use_git=True the list comes from
+    `git ls-files` instead (falling back to the walk outside a git checkout).
+    """
     root = Path(root)
-    return [p for p in root.rglob("*") if p.suffix in exts]
+    patterns = tuple(re.compile(translate(g)) for g in (*DEFAULT_EXCLUDES, *excludes))
+    build_dirs = frozenset(build_dirs)
+
+    if use_git:
+        listed = _git_ls_files(root)
+        if listed is not None:
+            module_roots = {}  # rel dir -> holds a build file
+
+            def is_module_root(rel_dir):
+                if rel_dir not in module_roots:
+                    module_roots[rel_dir] = not rel_dir or any(
+                        (root / rel_dir / b).is_file() for b in BUILD_FILES)
+                return module_roots[rel_dir]
+
+            for rel in sorted(listed, key=lambda r: r.split("/")):
+                parts = rel.split("/")
+                if os.path.splitext(rel)[1] not in exts:
+                    continue
+                if any(_excluded(patterns, "/".join(parts[:i + 1]), parts[i])
+                       or (parts[i] in build_dirs and is_module_root("/".join(parts[:i])))
+                       for i in range(len(parts) - 1)):
+                    continue
+                if _excluded(patterns, rel, parts[-1]):
+                    continue
+                path = root / rel
+                if path.is_file():  # deleted-but-tracked files are still listed
+                    yield path
+            return
+
+    def listing(directory: str, rel: str, rules: List[_IgnoreRule]):
+        if gitignore:
+            rules = rules + _read_gitignore(directory, rel)
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            entries = []
+        module_root = not rel or any(e.name in BUILD_FILES for e in entries)
+        return iter(entries), rel, rules, module_root
+
+    # explicit stack of sorted directory iterators: depth-first, in path order
+    stack = [listing(str(root), "", [])]
+    while stack:
+        entries, rel_dir, rules, module_root = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+        rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+        is_dir = entry.is_dir(follow_symlinks=False)
+        if _excluded(patterns, rel, entry.name) or _ignored(rules, rel, entry.name, is_dir):
+            continue
+        if is_dir:
+            if module_root and entry.name in build_dirs:
+                continue
+            stack.append(listing(entry.path, rel, rules))
+        elif os.path.splitext(entry.name)[1] in exts and entry.is_file():
+            yield Path(entry.path)
+
+
+def find_files(root: str | Path, exts=(".java",), **kwargs) -> list[Path]:
+    """All matching files under root as a sorted list; see iter_files for options."""
+    return list(iter_files(root, exts, **kwargs))
+
+
+def _posix_parts(path: str) -> List[str]:
+    return [p for p in path.replace("\\", "/").split("/") if p and p != "."]
+
+
+class PathIndex:
+    """
+    Match paths written relative to different roots, built once over a key set.
+
+    lookup() tries an exact match on the normalized posix path, then the
+    longest key that is a component-wise suffix of the query (a relative key
+    under an absolute query), then any key that ends with the query. Each
+    step walks a trie of reversed path components, so a lookup costs
+    O(path depth) regardless of how many keys are indexed.
+    """
+
+    def __init__(self, keys: Iterable[str] = ()):
+        self._exact = {}
+        self._trie = {}  # component -> child node; "\0" holds the key ending here, "\1" any key below
+        for key in keys:
+            self.add(key)
+
+    def add(self, key: str) -> None:
+        parts = _posix_parts(key)
+        self._exact.setdefault("/".join(parts), key)
+        node = self._trie
+        for part in reversed(parts):
+            node = node.setdefault(part, {})
+            node.setdefault("\1", key)
+        node.setdefault("\0", key)
+
+    def lookup(self, path: str) -> Optional[str]:
+        parts = _posix_parts(path)
+        key = self._exact.get("/".join(parts))
+        if key is not None:
+            return key
+        node, longest = self._trie, None
+        for part in reversed(parts):
+            node = node.get(part)
+            if node is None:
+                return longest
+            longest = node.get("\0", longest)
+        # every component matched: some key ends with the whole query
+        return longest if longest is not None else node.get("\1")
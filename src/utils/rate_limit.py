@@ -0,0 +1,90 @@
+"""
+Client-side throttling for remote API calls.
+
+TokenBucket caps the request rate across threads; retry_call re-invokes a
+function on transient failures (HTTP 429/5xx, timeouts, dropped connections)
+with exponential backoff and full jitter, honouring Retry-After when the
+error carries one.
+"""
+
+import random
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+# SDK exception class names that mean "try again" even without a status code
+_RETRYABLE_NAMES = ("RateLimitError", "Timeout", "APITimeoutError",
+                    "APIConnectionError", "ServiceUnavailableError")
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `burst` saved."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = float(burst if burst is not None else max(1, int(rate)))
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Block until `tokens` are available, then take them."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def status_of(exc: BaseException) -> Optional[int]:
+    """HTTP status carried by an SDK exception, if any."""
+    for attr in ("status_code", "http_status", "status"):
+        status = getattr(exc, attr, None)
+        if isinstance(status, int):
+            return status
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    status = status_of(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return isinstance(exc, (TimeoutError, ConnectionError)) or type(exc).__name__ in _RETRYABLE_NAMES
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(exc, "headers", None) or getattr(getattr(exc, "response", None), "headers", None)
+    try:
+        return float(headers["retry-after"]) if headers else None
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def retry_call(fn: Callable[[], T], max_retries: int = 5, base_delay: float = 1.0,
+               max_delay: float = 60.0,
+               retryable: Callable[[BaseException], bool] = is_retryable) -> T:
+    """Call fn(), retrying transient failures up to max_retries times."""
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= max_retries or not retryable(e):
+                raise
+            delay = _retry_after(e)
+            if delay is None:
+                delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            attempt += 1
+            time.sleep(delay)